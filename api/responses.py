@@ -0,0 +1,15 @@
+"""
+Shared response classes for the REST routers
+"""
+
+from fastapi import Response
+from pydantic_core import to_jsonable_python
+from typing import Any
+import orjson
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson; returned directly it also skips jsonable_encoder"""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
@@ -2,19 +2,25 @@
 REST API endpoints for Project Prometheus
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
-import json
+from pydantic import BaseModel, ValidationError, TypeAdapter
+from typing import Dict, Any, Optional, Callable, Tuple, Iterator
+import orjson
+from operator import attrgetter
+from itertools import chain
 import csv
+import hashlib
 import io
-from api.websockets import manager
-from models.schemas import Objective
+import time
+from api.responses import ORJSONResponse
+from api.websockets import manager, GLOBAL_ROOM
+from models.schemas import Objective, Agent, WorldState
+from models.enums import RoleEnum
 from database.event_logger import event_logger
 from core.session_manager import session_manager
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Include rule management routes
 try:
@@ -23,6 +29,89 @@ try:
 except ImportError as e:
     print(f"Warning: Rule management API not available: {e}")
 
+# Raised by require_world; built once since dashboards poll before an experiment starts
+_WORLD_NOT_INITIALIZED = HTTPException(status_code=404, detail="World not initialized")
+
+def require_world() -> WorldState:
+    """Dependency returning the current world state, or 404 if none has been created"""
+    world_state = manager.game_engine.get_world_state()
+    if not world_state:
+        # Drop the traceback from the previous raise so it does not keep growing
+        raise _WORLD_NOT_INITIALIZED.with_traceback(None)
+    return world_state
+
+# Bodies of responses that never change, encoded once at import
+_API_ROOT_BODY = orjson.dumps({"message": "Project Prometheus API v1.0"})
+_STATUS_NOT_INITIALIZED_BODY = orjson.dumps({"status": "not_initialized", "is_running": False})
+
+# Short-lived response cache for endpoints polled by the dashboard
+RESPONSE_CACHE_TTL = 2.0  # seconds
+_response_cache: Dict[str, Tuple[tuple, float, bytes, str]] = {}
+
+def _cached_json(name: str, world_state, build: Callable[[Any], Any],
+                 request: Optional[Request] = None) -> Response:
+    """Return the JSON body for `name`, rebuilding it only when the world state changed
+    
+    `build` may return ready-made JSON bytes or any value ORJSONResponse can render.
+    The response carries an ETag hashed from the body, so a matching
+    If-None-Match gets an empty 304 only when the content is unchanged.
+    """
+    key = (world_state.session_id, world_state.day, world_state.hour,
+           world_state.minute, manager.state_version)
+    
+    now = time.monotonic()
+    entry = _response_cache.get(name)
+    if entry and entry[0] == key and entry[1] > now:
+        body, etag = entry[2], entry[3]
+    else:
+        content = build(world_state)
+        body = content if isinstance(content, bytes) else ORJSONResponse(content=content).body
+        etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        _response_cache[name] = (key, now + RESPONSE_CACHE_TTL, body, etag)
+    
+    headers = {"ETag": etag}
+    if request is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Built once; dump_json serializes straight to bytes without an intermediate dict
+WORLD_ADAPTER = TypeAdapter(WorldState)
+AGENT_ADAPTER = TypeAdapter(Agent)
+
+# Projection served by GET /agents
+AGENT_SUMMARY_FIELDS = ("agent_id", "name", "role", "position", "hp", "sanity", "status_tags")
+_agent_summary_values = attrgetter(*AGENT_SUMMARY_FIELDS)
+
+# Event columns of the CSV exports, in header order
+_EVENT_CSV_VALUES = attrgetter(
+    "id", "session_id", "day", "hour", "minute", "agent_id", "agent_name", "event_type",
+    "description", "details", "timestamp", "ai_prompt_content", "ai_thinking_process", "ai_decision"
+)
+_AI_DECISION_CSV_HEAD = attrgetter("id", "session_id", "day", "hour", "minute",
+                                   "agent_id", "agent_name", "ai_decision")
+_AI_DECISION_CSV_TAIL = attrgetter("timestamp", "ai_prompt_content", "ai_thinking_process")
+
+def _csv_line(row) -> bytes:
+    """Encode one CSV row exactly as csv.writer would write it"""
+    output = io.StringIO()
+    csv.writer(output).writerow(row)
+    return output.getvalue().encode('utf-8')
+
+# Header lines of the CSV exports, encoded once
+_EVENT_CSV_HEADER = _csv_line([
+    "ID", "Session ID", "Day", "Hour", "Minute", "Agent ID", 
+    "Agent Name", "Event Type", "Description", "Details", "Timestamp",
+    "AI_Prompt_Content", "AI_Thinking_Process", "AI_Decision",
+    "Agent_HP", "Agent_Sanity", "Agent_Hunger", "Agent_Thirst", "Agent_Strength",
+    "Agent_Position_X", "Agent_Position_Y", "Agent_Action_Points", "Agent_Status_Tags",
+    "Agent_Inventory_Count", "Agent_Relationships_Count"
+])
+_AI_DECISION_CSV_HEADER = _csv_line([
+    "ID", "Session ID", "Day", "Hour", "Minute", "Agent ID", "Agent Name", 
+    "AI_Decision", "Decision_Parameters", "Timestamp", 
+    "Full_Prompt_Content", "Thinking_Process"
+])
+
 class ExperimentConfig(BaseModel):
     """Configuration for starting an experiment"""
     duration_days: int = 14
@@ -31,6 +120,22 @@ class ExperimentConfig(BaseModel):
     prisoner_count: int = 4
     model: str = "openai/gpt-4o-mini"
     
+# Goal an agent falls back to once its manual goals are cleared
+DEFAULT_GOAL_BY_ROLE = {
+    RoleEnum.GUARD: "Patrol and maintain order in the prison",
+    RoleEnum.PRISONER: "Survive and adapt to prison life"
+}
+
+# Agent fields an intervention may overwrite; everything else in `changes` is ignored
+INTERVENTION_FIELDS = frozenset({
+    "hp", "sanity", "hunger", "thirst", "strength",
+    "action_points", "status_tags", "position"
+})
+# Agent fields shown by the map, agent cards and turn indicator, which every client renders
+GLOBAL_AGENT_FIELDS = frozenset({
+    "position", "hp", "sanity", "hunger", "thirst", "action_points", "status_tags"
+})
+
 class InterventionRequest(BaseModel):
     """Request to intervene on an agent"""
     agent_id: str
@@ -55,7 +160,7 @@ class CustomGoalRequest(BaseModel):
 @router.get("/")
 async def api_root():
     """API root endpoint"""
-    return {"message": "Project Prometheus API v1.0"}
+    return Response(content=_API_ROOT_BODY, media_type="application/json")
 
 @router.post("/experiment/start")
 async def start_experiment(config: ExperimentConfig = ExperimentConfig()):
@@ -84,148 +189,135 @@ async def stop_experiment():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/experiment/status")
-async def get_experiment_status():
+async def get_experiment_status(request: Request):
     """Get current experiment status"""
     world_state = manager.game_engine.get_world_state()
     
     if not world_state:
-        return {"status": "not_initialized", "is_running": False}
+        return Response(content=_STATUS_NOT_INITIALIZED_BODY, media_type="application/json")
     
-    return {
+    return _cached_json("experiment_status", world_state, lambda ws: {
         "status": "initialized",
-        "is_running": world_state.is_running,
-        "day": world_state.day,
-        "hour": world_state.hour,
-        "agent_count": len(world_state.agents)
-    }
+        "is_running": ws.is_running,
+        "day": ws.day,
+        "hour": ws.hour,
+        "agent_count": len(ws.agents)
+    }, request)
 
 @router.get("/world")
-async def get_world_state():
+async def get_world_state(request: Request, world_state: WorldState = Depends(require_world)):
     """Get current world state"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
-    return world_state.dict()
+    return _cached_json("world", world_state, WORLD_ADAPTER.dump_json, request)
 
 @router.post("/intervene/agent/{agent_id}")
-async def intervene_agent(agent_id: str, intervention: InterventionRequest):
+async def intervene_agent(agent_id: str,
+                          intervention: InterventionRequest,
+                          world_state: WorldState = Depends(require_world)):
     """Intervene on a specific agent"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
     
-    # Apply changes
-    for key, value in intervention.changes.items():
-        if hasattr(agent, key):
-            setattr(agent, key, value)
+    # Validate allowed changes against the Agent schema on a copy, then apply them together
+    updates = {key: value for key, value in intervention.changes.items() if key in INTERVENTION_FIELDS}
+    candidate = agent.model_copy()
+    try:
+        for key, value in updates.items():
+            Agent.__pydantic_validator__.validate_assignment(candidate, key, value)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
     
-    # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    # Values are already validated, so write them without another pass through __setattr__
+    applied = {key: candidate.__dict__[key] for key in updates}
+    agent.__dict__.update(applied)
+    
+    # Broadcast only the changed fields: summary fields to everyone, the rest to clients watching this agent
+    global_paths = [f"agents.{agent_id}.{key}" for key in applied if key in GLOBAL_AGENT_FIELDS]
+    detail_paths = [f"agents.{agent_id}.{key}" for key in applied if key not in GLOBAL_AGENT_FIELDS]
+    if global_paths:
+        manager.schedule_broadcast(world_state, global_paths, room=GLOBAL_ROOM)
+    if detail_paths:
+        manager.schedule_broadcast(world_state, detail_paths, room=f"agent:{agent_id}")
     
-    return {"message": f"Intervention applied to {agent_id}", "changes": intervention.changes}
+    return {"message": f"Intervention applied to {agent_id}", "changes": applied}
 
 @router.get("/agents")
-async def get_agents():
+async def get_agents(request: Request, world_state: WorldState = Depends(require_world)):
     """Get all agents"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
-    return {
+    return _cached_json("agents", world_state, lambda ws: {
         "agents": [
-            {
-                "agent_id": agent.agent_id,
-                "name": agent.name,
-                "role": agent.role,
-                "position": agent.position,
-                "hp": agent.hp,
-                "sanity": agent.sanity,
-                "status_tags": agent.status_tags
-            }
-            for agent in world_state.agents.values()
+            dict(zip(AGENT_SUMMARY_FIELDS, _agent_summary_values(agent)))
+            for agent in ws.agents.values()
         ]
-    }
+    }, request)
 
 @router.get("/agents/{agent_id}")
-async def get_agent(agent_id: str):
+async def get_agent(agent_id: str, world_state: WorldState = Depends(require_world)):
     """Get specific agent details"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    return world_state.agents[agent_id].dict()
+    return Response(content=AGENT_ADAPTER.dump_json(world_state.agents[agent_id]),
+                    media_type="application/json")
 
 @router.get("/agents/{agent_id}/memory")
-async def get_agent_memory(agent_id: str):
-    """Get agent's complete memory history with timestamps"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
+async def get_agent_memory(agent_id: str,
+                           legacy_timestamp: bool = False,
+                           world_state: WorldState = Depends(require_world)):
+    """Get agent's complete memory history with day/hour stamps
     
+    `legacy_timestamp` adds the old preformatted "Day N Hour H" string to each entry.
+    """
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
     
     # Get agent's memory from event logs for complete history with timestamps
-    session_id = world_state.session_id if hasattr(world_state, 'session_id') else None
+    session_id = world_state.session_id
     events = event_logger.get_events(
         limit=1000,  # Get plenty of history
         agent_id=agent_id,
-        session_id=session_id
+        session_id=session_id,
+        columns=("id", "day", "hour", "description", "event_type")
     )
     
-    # Format memory with timestamps
-    memory_entries = []
-    for event in reversed(events):  # Reverse to get newest first
-        if event.description:
-            memory_entries.append({
-                "timestamp": f"Day {event.day} Hour {event.hour}",
-                "content": event.description,
-                "event_type": event.event_type,
-                "day": event.day,
-                "hour": event.hour
-            })
-    
-    return {
+    # Format memory entries (the logger already returns newest first)
+    memory_entries = [
+        {
+            "content": event.description,
+            "event_type": event.event_type,
+            "day": event.day,
+            "hour": event.hour
+        } for event in events if event.description
+    ]
+    if legacy_timestamp:
+        for entry in memory_entries:
+            entry["timestamp"] = f"Day {entry['day']} Hour {entry['hour']}"
+    
+    return ORJSONResponse(content={
         "agent_id": agent_id,
         "agent_name": agent.name,
-        "enhanced_memory": agent.enhanced_memory.dict() if agent.enhanced_memory else {},
-        "legacy_memory": agent.memory if hasattr(agent, 'memory') else {},
+        "enhanced_memory": orjson.Fragment(agent.enhanced_memory.model_dump_json()) if agent.enhanced_memory else {},
+        "legacy_memory": agent.memory,
         "timestamped_history": memory_entries,
-        "last_thinking": getattr(agent, 'last_thinking', ''),
+        "last_thinking": agent.last_thinking,
         "thinking_history": agent.enhanced_memory.thinking_history if agent.enhanced_memory else []
-    }
+    })
 
 @router.get("/agents/{agent_id}/refresh")
-async def refresh_agent_details(agent_id: str):
+async def refresh_agent_details(agent_id: str,
+                                legacy_timestamp: bool = False,
+                                world_state: WorldState = Depends(require_world)):
     """Refresh and get complete agent details including latest memory and status"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
     
     # Get latest events for this agent
-    session_id = world_state.session_id if hasattr(world_state, 'session_id') else None
+    session_id = world_state.session_id
     recent_events = event_logger.get_events(
         limit=20,
         agent_id=agent_id,
@@ -234,43 +326,48 @@ async def refresh_agent_details(agent_id: str):
     
     # Get latest prompt data if available
     prompt_data = None
-    if hasattr(world_state, 'agent_prompts') and agent_id in world_state.agent_prompts:
-        prompt_data = world_state.agent_prompts[agent_id].dict()
-    
-    return {
-        "agent": agent.dict(),
-        "recent_events": [
-            {
-                "timestamp": f"Day {event.day} Hour {event.hour}",
-                "description": event.description,
-                "event_type": event.event_type,
-                "day": event.day,
-                "hour": event.hour
-            } for event in reversed(recent_events)
-        ],
+    agent_prompt = world_state.agent_prompts.get(agent_id)
+    if agent_prompt is not None:
+        prompt_data = agent_prompt.dict()
+    
+    # Newest first, matching the timestamped history of /agents/{agent_id}/memory
+    events_out = [
+        {
+            "description": event.description,
+            "event_type": event.event_type,
+            "day": event.day,
+            "hour": event.hour
+        } for event in recent_events
+    ]
+    if legacy_timestamp:
+        for entry in events_out:
+            entry["timestamp"] = f"Day {entry['day']} Hour {entry['hour']}"
+    
+    return ORJSONResponse(content={
+        "agent": orjson.Fragment(AGENT_ADAPTER.dump_json(agent)),
+        "recent_events": events_out,
         "prompt_data": prompt_data,
         "world_time": {
             "day": world_state.day,
             "hour": world_state.hour
         }
-    }
+    })
 
 @router.post("/agents/{agent_id}/inject_goal")
-async def inject_goal_to_agent(agent_id: str, goal_request: GoalInjectionRequest):
+async def inject_goal_to_agent(agent_id: str,
+                               goal_request: GoalInjectionRequest,
+                               world_state: WorldState = Depends(require_world)):
     """Inject a manual goal to a specific agent"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
+    goals = agent.dynamic_goals
+    goals._manual_goal_seq += 1
     
     # Create manual intervention goal
     manual_goal = Objective(
-        objective_id=f"{agent_id}_manual_{len(agent.dynamic_goals.manual_intervention_goals) + 1}",
+        objective_id=f"{agent_id}_manual_{goals._manual_goal_seq}",
         name=goal_request.goal_name,
         description=goal_request.goal_description,
         type="Manual",
@@ -280,16 +377,19 @@ async def inject_goal_to_agent(agent_id: str, goal_request: GoalInjectionRequest
     )
     
     # Replace current goal with injected goal
-    agent.dynamic_goals.current_goal = f"{goal_request.goal_name}: {goal_request.goal_description}"
+    goals.current_goal = f"{goal_request.goal_name}: {goal_request.goal_description}"
     
     # Add to manual intervention goals list
-    agent.dynamic_goals.manual_intervention_goals.append(manual_goal)
+    goals.manual_intervention_goals.append(manual_goal)
     
     # Add memory of the intervention
     agent.memory["episodic"].append(f"[ADMIN INTERVENTION] New goal assigned: {goal_request.goal_name}")
     
     # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    manager.schedule_broadcast(
+        world_state, [f"agents.{agent_id}.dynamic_goals", f"agents.{agent_id}.memory"],
+        room=f"agent:{agent_id}"
+    )
     
     return {
         "message": f"Goal injected to {agent.name}",
@@ -301,50 +401,43 @@ async def inject_goal_to_agent(agent_id: str, goal_request: GoalInjectionRequest
     }
 
 @router.delete("/agents/{agent_id}/clear_manual_goals")
-async def clear_manual_goals(agent_id: str):
+async def clear_manual_goals(agent_id: str, world_state: WorldState = Depends(require_world)):
     """Clear all manual intervention goals from an agent"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
     
+    goals = agent.dynamic_goals
+    
     # Clear manual goals
-    cleared_count = len(agent.dynamic_goals.manual_intervention_goals)
-    agent.dynamic_goals.manual_intervention_goals = []
+    cleared_count = len(goals.manual_intervention_goals)
+    goals.manual_intervention_goals = []
     
     # Reset current goal to default
-    if agent.role.value == "Guard":
-        agent.dynamic_goals.current_goal = "Patrol and maintain order in the prison"
-    else:
-        agent.dynamic_goals.current_goal = "Survive and adapt to prison life"
+    goals.current_goal = DEFAULT_GOAL_BY_ROLE[agent.role]
     
     # Add memory of clearing
     agent.memory["episodic"].append(f"[ADMIN INTERVENTION] Manual goals cleared")
     
     # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    manager.schedule_broadcast(
+        world_state, [f"agents.{agent_id}.dynamic_goals", f"agents.{agent_id}.memory"],
+        room=f"agent:{agent_id}"
+    )
     
     return {
         "message": f"Cleared {cleared_count} manual goals from {agent.name}"
     }
 
 @router.post("/environment/inject")
-async def inject_environmental_context(request: EnvironmentalInjectionRequest):
+async def inject_environmental_context(request: EnvironmentalInjectionRequest,
+                                       world_state: WorldState = Depends(require_world)):
     """Inject environmental context that all agents will see"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     world_state.environmental_injection = request.environmental_context
     
     # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    manager.schedule_broadcast(world_state, ["environmental_injection"])
     
     return {
         "message": "Environmental context injected successfully",
@@ -352,30 +445,22 @@ async def inject_environmental_context(request: EnvironmentalInjectionRequest):
     }
 
 @router.delete("/environment/clear")
-async def clear_environmental_context():
+async def clear_environmental_context(world_state: WorldState = Depends(require_world)):
     """Clear environmental injection"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     world_state.environmental_injection = ""
     
     # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    manager.schedule_broadcast(world_state, ["environmental_injection"])
     
     return {
         "message": "Environmental context cleared"
     }
 
 @router.post("/agents/{agent_id}/custom_goals")
-async def set_custom_goals(agent_id: str, request: CustomGoalRequest):
+async def set_custom_goals(agent_id: str,
+                           request: CustomGoalRequest,
+                           world_state: WorldState = Depends(require_world)):
     """Set custom character goals for an agent"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
@@ -388,7 +473,10 @@ async def set_custom_goals(agent_id: str, request: CustomGoalRequest):
     agent.memory["episodic"].append(f"[ADMIN] Custom goals set: {request.custom_goals}")
     
     # Broadcast updated state
-    await manager.broadcast_world_state(world_state)
+    manager.schedule_broadcast(
+        world_state, [f"agents.{agent_id}.dynamic_goals", f"agents.{agent_id}.memory"],
+        room=f"agent:{agent_id}"
+    )
     
     return {
         "message": f"Custom goals set for {agent.name}",
@@ -396,41 +484,56 @@ async def set_custom_goals(agent_id: str, request: CustomGoalRequest):
     }
 
 @router.get("/agents/{agent_id}/custom_goals")
-async def get_custom_goals(agent_id: str):
+async def get_custom_goals(agent_id: str, world_state: WorldState = Depends(require_world)):
     """Get current custom goals for an agent"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if agent_id not in world_state.agents:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     agent = world_state.agents[agent_id]
     
-    return {
+    return ORJSONResponse(content={
         "agent_id": agent_id,
         "agent_name": agent.name,
         "custom_goals": agent.dynamic_goals.current_goal or ""
-    }
+    })
 
 @router.get("/events")
 async def get_events(limit: int = 100, offset: int = 0, 
                     agent_id: Optional[str] = None,
                     event_type: Optional[str] = None,
                     day: Optional[int] = None,
-                    session_id: Optional[str] = None):
-    """Get event history with filtering options"""
+                    session_id: Optional[str] = None,
+                    cursor: Optional[str] = None):
+    """Get event history with filtering options
+    
+    Pass the returned `next_cursor` back as `cursor` to fetch the next page;
+    `offset` is kept for existing clients but gets slower as it grows.
+    """
+    before = None
+    if cursor:
+        try:
+            before = tuple(int(part) for part in cursor.split(":"))
+        except ValueError:
+            before = ()
+        if len(before) != 4:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     events = event_logger.get_events(
         limit=limit, 
-        offset=offset, 
+        offset=0 if before else offset, 
         agent_id=agent_id, 
         event_type=event_type, 
         day=day,
-        session_id=session_id
+        session_id=session_id,
+        before=before
     )
     
-    return {
+    next_cursor = None
+    if events and len(events) == limit:
+        last = events[-1]
+        next_cursor = f"{last.day}:{last.hour}:{last.minute}:{last.id}"
+    
+    return ORJSONResponse(content={
         "events": [
             {
                 "id": e.id,
@@ -451,13 +554,14 @@ async def get_events(limit: int = 100, offset: int = 0,
             for e in events
         ],
         "total_requested": limit,
-        "offset": offset
-    }
+        "offset": offset,
+        "next_cursor": next_cursor
+    })
 
 @router.get("/events/stats")
 async def get_event_stats():
     """Get event statistics"""
-    return event_logger.get_event_stats()
+    return ORJSONResponse(content=event_logger.get_event_stats())
 
 @router.delete("/events/clear")
 async def clear_events(before_day: Optional[int] = None):
@@ -473,71 +577,51 @@ async def export_events_csv(session_id: Optional[str] = None,
                            event_type: Optional[str] = None,
                            day: Optional[int] = None):
     """Export events to CSV format with enhanced AI decision data"""
-    # Get all events with filtering
-    events = event_logger.get_events(
-        limit=10000,  # Large limit for export
-        offset=0,
-        agent_id=agent_id,
-        event_type=event_type,
-        day=day,
-        session_id=session_id
-    )
-    
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write enhanced header with AI decision data columns and agent state
-    writer.writerow([
-        "ID", "Session ID", "Day", "Hour", "Minute", "Agent ID", 
-        "Agent Name", "Event Type", "Description", "Details", "Timestamp",
-        "AI_Prompt_Content", "AI_Thinking_Process", "AI_Decision",
-        "Agent_HP", "Agent_Sanity", "Agent_Hunger", "Agent_Thirst", "Agent_Strength",
-        "Agent_Position_X", "Agent_Position_Y", "Agent_Action_Points", "Agent_Status_Tags",
-        "Agent_Inventory_Count", "Agent_Relationships_Count"
-    ])
-    
     # Get current world state to add agent status info
     from api.websockets import manager
     world_state = manager.game_engine.get_world_state()
     
-    # Write data rows with enhanced AI decision data and agent state
-    for event in events:
-        # Use AI decision data directly from the database
-        ai_prompt = event.ai_prompt_content or ""
-        ai_thinking = event.ai_thinking_process or ""
-        ai_decision = event.ai_decision or ""
+    # Snapshot agent state columns once (use current state as approximation of state at event time)
+    empty_agent_columns = ("",) * 11
+    agent_columns = {}
+    if world_state:
+        for state_agent_id, agent in world_state.agents.items():
+            agent_columns[state_agent_id] = (
+                agent.hp, agent.sanity, agent.hunger, agent.thirst, agent.strength,
+                agent.position[0], agent.position[1], agent.action_points,
+                ",".join(agent.status_tags), len(agent.inventory), len(agent.relationships)
+            )
+    
+    def generate_csv():
+        # Enhanced header with AI decision data columns and agent state
+        yield _EVENT_CSV_HEADER
         
-        # Get agent state at the time of event (use current state as approximation)
-        agent_hp = agent_sanity = agent_hunger = agent_thirst = agent_strength = ""
-        agent_pos_x = agent_pos_y = agent_ap = agent_status = agent_inv = agent_rel = ""
+        output = io.StringIO()
+        writer = csv.writer(output)
         
-        if world_state and event.agent_id in world_state.agents:
-            agent = world_state.agents[event.agent_id]
-            agent_hp = agent.hp
-            agent_sanity = agent.sanity
-            agent_hunger = agent.hunger
-            agent_thirst = agent.thirst
-            agent_strength = agent.strength
-            agent_pos_x, agent_pos_y = agent.position
-            agent_ap = agent.action_points
-            agent_status = ",".join(agent.status_tags)
-            agent_inv = len(agent.inventory)
-            agent_rel = len(agent.relationships)
-        
-        writer.writerow([
-            event.id, event.session_id, event.day, event.hour, event.minute,
-            event.agent_id, event.agent_name, event.event_type, 
-            event.description, event.details, event.timestamp,
-            ai_prompt, ai_thinking, ai_decision,
-            agent_hp, agent_sanity, agent_hunger, agent_thirst, agent_strength,
-            agent_pos_x, agent_pos_y, agent_ap, agent_status, agent_inv, agent_rel
-        ])
-    
-    # Create response
+        # Write data rows with enhanced AI decision data and agent state, one batch at a time
+        for events in event_logger.iter_event_batches(
+            agent_id=agent_id,
+            event_type=event_type,
+            day=day,
+            session_id=session_id,
+            blank_ai_fields=True
+        ):
+            output.seek(0)
+            output.truncate(0)
+            
+            # Use AI decision data directly from the database
+            writer.writerows(
+                _EVENT_CSV_VALUES(event) + agent_columns.get(event.agent_id, empty_agent_columns)
+                for event in events
+            )
+            
+            yield output.getvalue().encode('utf-8')
+    
+    # Stream the CSV as it is generated
     filename = f"prometheus_events_enhanced_{session_id or 'all'}.csv"
     response = StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+        generate_csv(),
         media_type='text/csv',
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -548,61 +632,17 @@ async def export_events_csv(session_id: Optional[str] = None,
 async def export_events_json(session_id: Optional[str] = None,
                             agent_id: Optional[str] = None,
                             event_type: Optional[str] = None,
-                            day: Optional[int] = None):
-    """Export events to JSON format"""
-    # Get all events with filtering
-    events = event_logger.get_events(
-        limit=10000,  # Large limit for export
-        offset=0,
-        agent_id=agent_id,
-        event_type=event_type,
-        day=day,
-        session_id=session_id
-    )
-    
-    # Convert to JSON format
-    export_data = {
-        "export_info": {
-            "total_events": len(events),
-            "filters": {
-                "session_id": session_id,
-                "agent_id": agent_id,
-                "event_type": event_type,
-                "day": day
-            },
-            "exported_at": event_logger.get_events(limit=1)[0].timestamp if events else None
-        },
-        "events": []
-    }
-    
+                            day: Optional[int] = None,
+                            pretty: bool = False):
+    """Export events to JSON format (compact unless `pretty` is set)"""
     # Get current world state to add agent status info
-    from api.websockets import manager
     world_state = manager.game_engine.get_world_state()
     
-    # Add events with agent state data
-    for e in events:
-        event_data = {
-            "id": e.id,
-            "session_id": e.session_id,
-            "day": e.day,
-            "hour": e.hour,
-            "minute": e.minute,
-            "agent_id": e.agent_id,
-            "agent_name": e.agent_name,
-            "event_type": e.event_type,
-            "description": e.description,
-            "details": e.details,
-            "timestamp": e.timestamp,
-            "ai_prompt_content": e.ai_prompt_content,
-            "ai_thinking_process": e.ai_thinking_process,
-            "ai_decision": e.ai_decision,
-            "agent_state": {}
-        }
-        
-        # Add agent state at the time of event (use current state as approximation)
-        if world_state and e.agent_id in world_state.agents:
-            agent = world_state.agents[e.agent_id]
-            event_data["agent_state"] = {
+    # Snapshot agent state once (use current state as approximation of state at event time)
+    agent_states = {}
+    if world_state:
+        for state_agent_id, agent in world_state.agents.items():
+            agent_states[state_agent_id] = {
                 "hp": agent.hp,
                 "sanity": agent.sanity,
                 "hunger": agent.hunger,
@@ -615,125 +655,155 @@ async def export_events_json(session_id: Optional[str] = None,
                 "relationships_count": len(agent.relationships),
                 "role": agent.role.value
             }
-        
-        export_data["events"].append(event_data)
     
-    # Create JSON response
+    # Stream the document batch by batch; the sync generator runs in Starlette's threadpool
     filename = f"prometheus_events_enhanced_{session_id or 'all'}.json"
-    json_content = json.dumps(export_data, indent=2)
-    
-    response = StreamingResponse(
-        io.BytesIO(json_content.encode('utf-8')),
+    return StreamingResponse(
+        _stream_events_json(agent_states, session_id, agent_id, event_type, day, pretty),
         media_type='application/json',
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
+
+def _stream_events_json(agent_states: Dict[str, Dict[str, Any]],
+                        session_id: Optional[str], agent_id: Optional[str],
+                        event_type: Optional[str], day: Optional[int],
+                        pretty: bool = False) -> Iterator[bytes]:
+    """Yield the JSON export document for the given filters, one event batch per chunk"""
+    option = orjson.OPT_INDENT_2 if pretty else 0
+    separator = b",\n" if pretty else b","
+    filters = {"agent_id": agent_id, "event_type": event_type, "day": day, "session_id": session_id}
+    
+    # Each agent's state is encoded once and spliced into every one of its events
+    state_fragments = {
+        state_agent_id: orjson.Fragment(orjson.dumps(state, option=option))
+        for state_agent_id, state in agent_states.items()
+    }
+    no_state = orjson.Fragment(b"{}")
+    
+    # The first batch is fetched up front because export_info needs the newest event
+    batch_size = 500
+    batches = event_logger.iter_event_batches(batch_size=batch_size, **filters)
+    first_batch = next(batches, [])
+    # A short first batch is the whole result, so the COUNT query is only needed for larger exports
+    total_events = len(first_batch) if len(first_batch) < batch_size else event_logger.count_events(**filters)
+    export_info = {
+        "total_events": total_events,
+        "filters": {
+            "session_id": session_id,
+            "agent_id": agent_id,
+            "event_type": event_type,
+            "day": day
+        },
+        # Events are newest first, so this is the latest matching event
+        "exported_at": first_batch[0].timestamp if first_batch else None
+    }
+    yield b'{"export_info":' + orjson.dumps(export_info, option=option) + b',"events":['
     
-    return response
+    # Add events with agent state data
+    first = True
+    for events in chain((first_batch,), batches):
+        if not events:
+            continue
+        chunk = separator.join(orjson.dumps({
+            "id": e.id,
+            "session_id": e.session_id,
+            "day": e.day,
+            "hour": e.hour,
+            "minute": e.minute,
+            "agent_id": e.agent_id,
+            "agent_name": e.agent_name,
+            "event_type": e.event_type,
+            "description": e.description,
+            "details": e.details,
+            "timestamp": e.timestamp,
+            "ai_prompt_content": e.ai_prompt_content,
+            "ai_thinking_process": e.ai_thinking_process,
+            "ai_decision": e.ai_decision,
+            "agent_state": state_fragments.get(e.agent_id, no_state)
+        }, option=option) for e in events)
+        yield chunk if first else separator + chunk
+        first = False
+    
+    yield b"]}\n"
 
 @router.get("/events/export/ai_decisions")
 async def export_ai_decisions_csv(session_id: Optional[str] = None,
                                  agent_id: Optional[str] = None,
                                  day: Optional[int] = None):
     """Export only AI decision events with detailed prompt and thinking data"""
-    # Get AI decision events specifically
-    events = event_logger.get_events(
-        limit=10000,  # Large limit for export
-        offset=0,
-        agent_id=agent_id,
-        event_type="ai_decision",  # Only AI decision events
-        day=day,
-        session_id=session_id
-    )
-    
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header focused on AI decision analysis
-    writer.writerow([
-        "ID", "Session ID", "Day", "Hour", "Minute", "Agent ID", "Agent Name", 
-        "AI_Decision", "Decision_Parameters", "Timestamp", 
-        "Full_Prompt_Content", "Thinking_Process"
-    ])
-    
-    # Write data rows with detailed AI decision analysis
-    for event in events:
-        # Parse decision details if available
-        decision_params = ""
-        try:
-            details_data = json.loads(event.details) if event.details else {}
-            decision_params = json.dumps(details_data.get("parameters", {}))
-        except:
-            decision_params = event.details or ""
+    def generate_csv():
+        # Header focused on AI decision analysis
+        yield _AI_DECISION_CSV_HEADER
+        
+        output = io.StringIO()
+        writer = csv.writer(output)
         
-        writer.writerow([
-            event.id, event.session_id, event.day, event.hour, event.minute,
-            event.agent_id, event.agent_name, 
-            event.ai_decision or "", decision_params, event.timestamp,
-            event.ai_prompt_content or "", event.ai_thinking_process or ""
-        ])
-    
-    # Create response
+        # Write data rows with detailed AI decision analysis, one batch at a time
+        for events in event_logger.iter_event_batches(
+            agent_id=agent_id,
+            event_type="ai_decision",  # Only AI decision events
+            day=day,
+            session_id=session_id,
+            include_parameters=True,
+            blank_ai_fields=True
+        ):
+            output.seek(0)
+            output.truncate(0)
+            
+            writer.writerows(
+                _AI_DECISION_CSV_HEAD(event) + (_decision_parameters(event),) + _AI_DECISION_CSV_TAIL(event)
+                for event in events
+            )
+            
+            yield output.getvalue().encode('utf-8')
+    
+    # Stream the CSV as it is generated
     filename = f"prometheus_ai_decisions_{session_id or 'all'}.csv"
     response = StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+        generate_csv(),
         media_type='text/csv',
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
     
     return response
 
+def _decision_parameters(event) -> str:
+    """Serialized decision parameters of an ai_decision event"""
+    # Parameters come pre-serialized from SQL; details that are not a JSON object are exported as-is
+    if event.params is not None:
+        return event.params
+    return event.details or ""
+
 @router.get("/sessions")
 async def get_sessions():
     """Get all available session IDs"""
-    return session_manager.get_all_sessions()
+    return ORJSONResponse(content=session_manager.get_all_sessions())
 
 @router.get("/sessions/{session_id}/summary")
 async def get_session_summary(session_id: str):
     """Get comprehensive summary of a session for analysis"""
-    # Get all events for this session
-    events = event_logger.get_events(limit=10000, session_id=session_id)
+    # Aggregate in SQL rather than loading every event of the session
+    aggregates = event_logger.get_session_aggregates(session_id)
     
-    if not events:
+    if not aggregates["total_events"]:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Analyze events
-    agents = set()
-    event_types = {}
-    daily_activity = {}
-    agent_interactions = {}
+    agent_interactions = aggregates["agent_counts"]
     
-    for event in events:
-        agents.add(event.agent_name)
-        
-        # Count event types
-        event_types[event.event_type] = event_types.get(event.event_type, 0) + 1
-        
-        # Daily activity
-        day_key = f"Day {event.day}"
-        if day_key not in daily_activity:
-            daily_activity[day_key] = 0
-        daily_activity[day_key] += 1
-        
-        # Agent interactions
-        if event.agent_name not in agent_interactions:
-            agent_interactions[event.agent_name] = 0
-        agent_interactions[event.agent_name] += 1
-    
-    return {
+    return ORJSONResponse(content={
         "session_id": session_id,
         "summary": {
-            "total_events": len(events),
-            "unique_agents": len(agents),
-            "duration_days": max([e.day for e in events]) if events else 0,
-            "start_time": events[-1].timestamp if events else None,
-            "end_time": events[0].timestamp if events else None
+            "total_events": aggregates["total_events"],
+            "unique_agents": aggregates["unique_agents"],
+            "duration_days": aggregates["max_day"],
+            "start_time": aggregates["start_time"],
+            "end_time": aggregates["end_time"]
         },
-        "agents": list(agents),
-        "event_types": event_types,
-        "daily_activity": daily_activity,
+        "agents": list(agent_interactions),
+        "event_types": aggregates["event_types"],
+        "daily_activity": {f"Day {day}": count for day, count in aggregates["daily_activity"].items()},
         "agent_interactions": agent_interactions
-    }
+    })
 
 class ItemPlacementRequest(BaseModel):
     """Request to place an item on the map"""
@@ -745,14 +815,10 @@ class ItemPlacementRequest(BaseModel):
     item_description: str
 
 @router.post("/items/place")
-async def place_item(request: ItemPlacementRequest):
+async def place_item(request: ItemPlacementRequest,
+                     world_state: WorldState = Depends(require_world)):
     """Place an item on the map at specified coordinates"""
     try:
-        world_state = manager.game_engine.get_world_state()
-        
-        if not world_state:
-            raise HTTPException(status_code=404, detail="World not initialized")
-        
         if world_state.session_id != request.session_id:
             raise HTTPException(status_code=400, detail="Session ID mismatch")
         
@@ -764,7 +830,6 @@ async def place_item(request: ItemPlacementRequest):
         # Import Item class and ItemEnum
         from models.schemas import Item
         from models.enums import ItemEnum
-        import uuid
         
         # Create the item
         try:
@@ -772,8 +837,10 @@ async def place_item(request: ItemPlacementRequest):
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid item type: {request.item_type}")
         
+        # Sequential ids are unique within the session and need no random source
+        world_state._next_item_seq += 1
         new_item = Item(
-            item_id=f"{request.item_type}_{uuid.uuid4().hex[:8]}",
+            item_id=f"{request.item_type}_{world_state._next_item_seq:x}",
             name=request.item_name,
             description=request.item_description,
             item_type=item_enum
@@ -781,10 +848,7 @@ async def place_item(request: ItemPlacementRequest):
         
         # Add item to map
         position_key = f"{request.x},{request.y}"
-        if position_key not in world_state.game_map.items:
-            world_state.game_map.items[position_key] = []
-        
-        world_state.game_map.items[position_key].append(new_item)
+        world_state.game_map.items.setdefault(position_key, []).append(new_item)
         
         # Log the item placement event
         event_logger.log_event(
@@ -796,19 +860,21 @@ async def place_item(request: ItemPlacementRequest):
             agent_name="Research Team",
             event_type="item_placement",
             description=f"研究人员在({request.x}, {request.y})放置了{request.item_name}",
-            details=json.dumps({
+            details=orjson.dumps({
                 "item_id": new_item.item_id,
                 "item_type": request.item_type,
                 "position": [request.x, request.y],
                 "placed_by": "research_team"
-            })
+            }).decode()
         )
         
         # Add to world event log
         world_state.event_log.append(f"🔬 研究人员在({request.x}, {request.y})放置了{request.item_name}")
         
         # Broadcast the updated world state
-        await manager.broadcast_world_state()
+        manager.schedule_broadcast(
+            world_state, [f"game_map.items.{position_key}", "event_log"]
+        )
         
         return {
             "message": f"Successfully placed {request.item_name} at ({request.x}, {request.y})",
@@ -820,17 +886,16 @@ async def place_item(request: ItemPlacementRequest):
         raise HTTPException(status_code=500, detail=f"Failed to place item: {str(e)}")
 
 @router.get("/items/map")
-async def get_map_items(session_id: Optional[str] = None):
+async def get_map_items(session_id: Optional[str] = None,
+                        world_state: WorldState = Depends(require_world)):
     """Get all items currently on the map"""
-    world_state = manager.game_engine.get_world_state()
-    
-    if not world_state:
-        raise HTTPException(status_code=404, detail="World not initialized")
-    
     if session_id and world_state.session_id != session_id:
         raise HTTPException(status_code=400, detail="Session ID mismatch")
     
-    # Format items with their positions
+    return _cached_json("map_items", world_state, _build_map_items)
+
+def _build_map_items(world_state) -> Dict[str, Any]:
+    """Format map items with their positions"""
     items_by_position = {}
     for position_key, items in world_state.game_map.items.items():
         x, y = map(int, position_key.split(','))
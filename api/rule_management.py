@@ -5,10 +5,26 @@ Runtime rule control and monitoring endpoints
 
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any, List, Optional
+import time
 from pydantic import BaseModel
 from core.rule_engine import rule_engine, RuleCategory
+from core.world import World
+from api.responses import ORJSONResponse
+from api.websockets import manager
 
-router = APIRouter(prefix="/rules", tags=["rule_management"])
+router = APIRouter(prefix="/rules", tags=["rule_management"], default_response_class=ORJSONResponse)
+
+NEXT_TRIGGER_LIMIT = 10  # /debug/next-triggers 只返回最近的这么多个触发
+TRIGGER_CACHE_TTL = 5.0  # seconds；同一时刻、同一状态和规则版本下的触发检查结果复用这么久
+
+# 分类枚举是固定的，名称在导入时取一次
+_CATEGORY_NAMES = {category: category.value for category in RuleCategory}
+
+# rule_id -> (状态键, 过期时间, will_trigger)
+_trigger_cache: Dict[str, tuple] = {}
+
+# World 是单例，这里就是游戏引擎驱动的同一个实例
+world = World()
 
 
 class RuleConfigUpdate(BaseModel):
@@ -29,21 +45,21 @@ class RuleStatus(BaseModel):
     last_execution: Optional[str] = None
 
 
-@router.get("/status", response_model=Dict[str, Any])
+@router.get("/status")
 async def get_rule_engine_status():
     """获取规则引擎状态"""
     try:
         status = rule_engine.get_rule_status()
-        return {
+        return ORJSONResponse(content={
             "success": True,
             "data": status,
             "message": "Rule engine status retrieved successfully"
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get rule status: {str(e)}")
 
 
-@router.get("/list", response_model=List[RuleStatus])
+@router.get("/list")
 async def list_all_rules():
     """列出所有规则"""
     try:
@@ -51,23 +67,17 @@ async def list_all_rules():
         descriptions = rule_engine.get_rule_descriptions()
         
         for rule_id, rule in rule_engine.rules.items():
-            # 查找最近执行记录
-            last_execution = None
-            for history in reversed(rule_engine.rule_history):
-                if history["rule_id"] == rule_id:
-                    last_execution = history["timestamp"]
-                    break
-            
-            rules_info.append(RuleStatus(
-                rule_id=rule_id,
-                category=rule.category.value,
-                enabled=rule.enabled,
-                priority=rule.priority,
-                description=descriptions.get(rule_id, "No description available"),
-                last_execution=last_execution
-            ))
+            # 字段与 RuleStatus 相同，直接构造字典以跳过响应校验
+            rules_info.append({
+                "rule_id": rule_id,
+                "category": rule.category.value,
+                "enabled": rule.enabled,
+                "priority": rule.priority,
+                "description": descriptions.get(rule_id, "No description available"),
+                "last_execution": rule_engine.last_execution.get(rule_id)  # 最近执行记录
+            })
         
-        return rules_info
+        return ORJSONResponse(content=rules_info)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list rules: {str(e)}")
 
@@ -76,10 +86,9 @@ async def list_all_rules():
 async def enable_rule(rule_id: str):
     """启用规则"""
     try:
-        if rule_id not in rule_engine.rules:
+        if not rule_engine.enable_rule(rule_id):
             raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
         
-        rule_engine.enable_rule(rule_id)
         return {
             "success": True,
             "message": f"Rule {rule_id} enabled successfully"
@@ -94,10 +103,9 @@ async def enable_rule(rule_id: str):
 async def disable_rule(rule_id: str):
     """禁用规则"""
     try:
-        if rule_id not in rule_engine.rules:
+        if not rule_engine.disable_rule(rule_id):
             raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
         
-        rule_engine.disable_rule(rule_id)
         return {
             "success": True,
             "message": f"Rule {rule_id} disabled successfully"
@@ -112,15 +120,15 @@ async def disable_rule(rule_id: str):
 async def get_rule_execution_history(limit: int = 50):
     """获取规则执行历史"""
     try:
-        history = rule_engine.rule_history[-limit:] if rule_engine.rule_history else []
-        return {
+        history = rule_engine.recent_executions(limit)  # 最新的在前
+        return ORJSONResponse(content={
             "success": True,
             "data": {
-                "history": list(reversed(history)),  # 最新的在前
-                "total_executions": len(rule_engine.rule_history)
+                "history": history,
+                "total_executions": rule_engine.execution_count
             },
             "message": f"Retrieved last {len(history)} rule executions"
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get rule history: {str(e)}")
 
@@ -130,25 +138,19 @@ async def get_rule_categories():
     """获取规则分类信息"""
     try:
         categories_info = {}
-        for category in RuleCategory:
-            category_rules = [
-                rule_id for rule_id, rule in rule_engine.rules.items()
-                if rule.category == category
-            ]
-            categories_info[category.value] = {
-                "total_rules": len(category_rules),
-                "enabled_rules": len([
-                    rule_id for rule_id in category_rules
-                    if rule_engine.rules[rule_id].enabled
-                ]),
-                "rule_ids": category_rules
+        rules = rule_engine.rules
+        for category, rule_ids in rule_engine.rules_by_category.items():
+            categories_info[_CATEGORY_NAMES[category]] = {
+                "total_rules": len(rule_ids),
+                "enabled_rules": sum(rules[rule_id].enabled for rule_id in rule_ids),
+                "rule_ids": list(rule_ids)
             }
         
-        return {
+        return ORJSONResponse(content={
             "success": True,
             "data": categories_info,
             "message": "Rule categories retrieved successfully"
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get rule categories: {str(e)}")
 
@@ -157,17 +159,14 @@ async def get_rule_categories():
 async def test_rule_trigger(rule_id: str):
     """测试规则触发条件（仅检查，不执行）"""
     try:
-        if rule_id not in rule_engine.rules:
+        rule = rule_engine.rules.get(rule_id)
+        if rule is None:
             raise HTTPException(status_code=404, detail=f"Rule {rule_id} not found")
         
-        from core.world import World
-        world = World()
-        
         if not world.state:
             raise HTTPException(status_code=400, detail="World state not initialized")
         
-        rule = rule_engine.rules[rule_id]
-        will_trigger = rule.check_trigger(world.state)
+        will_trigger = _check_trigger_cached(rule_id, rule)
         
         return {
             "success": True,
@@ -185,6 +184,21 @@ async def test_rule_trigger(rule_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to test rule: {str(e)}")
 
 
+def _check_trigger_cached(rule_id: str, rule) -> bool:
+    """rule.check_trigger 的结果按 (会话, 模拟时间, 状态版本, 规则版本) 缓存，轮询时不必每次重算"""
+    state = world.state
+    key = (state.session_id, state.day, state.hour, state.minute,
+           manager.state_version, rule_engine.version)
+    now = time.monotonic()
+    entry = _trigger_cache.get(rule_id)
+    if entry and entry[0] == key and entry[1] > now:
+        return entry[2]
+    
+    will_trigger = rule.check_trigger(state)
+    _trigger_cache[rule_id] = (key, now + TRIGGER_CACHE_TTL, will_trigger)
+    return will_trigger
+
+
 @router.get("/food-distribution/status")
 async def get_food_distribution_status():
     """获取食物分发规则状态"""
@@ -207,11 +221,11 @@ async def get_food_distribution_status():
             else:
                 status[rule_id] = {"status": "not_found"}
         
-        return {
+        return ORJSONResponse(content={
             "success": True,
             "data": status,
             "message": "Food distribution rules status retrieved"
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get food distribution status: {str(e)}")
 
@@ -239,41 +253,38 @@ async def configure_food_distribution(config: Dict[str, Any]):
 async def get_next_rule_triggers():
     """获取接下来会触发的规则（调试用）"""
     try:
-        from core.world import World
-        world = World()
-        
         if not world.state:
             raise HTTPException(status_code=400, detail="World state not initialized")
         
         next_triggers = []
         current_hour = world.state.hour
         
-        # 检查接下来24小时内的触发情况
+        # 检查接下来24小时内的触发情况，凑满 NEXT_TRIGGER_LIMIT 个即停止
         for hour_offset in range(24):
+            if len(next_triggers) >= NEXT_TRIGGER_LIMIT:
+                break
             test_hour = (current_hour + hour_offset) % 24
             test_day = world.state.day + (current_hour + hour_offset) // 24
             
-            for rule_id, rule in rule_engine.rules.items():
-                if rule.enabled and hasattr(rule, 'trigger_hours'):
-                    if test_hour in rule.trigger_hours:
-                        next_triggers.append({
-                            "rule_id": rule_id,
-                            "trigger_time": f"Day {test_day} Hour {test_hour}:00",
-                            "hours_from_now": hour_offset,
-                            "category": rule.category.value
-                        })
-        
-        # 按时间排序
-        next_triggers.sort(key=lambda x: x["hours_from_now"])
+            # 按小时索引直接取出该小时的时间规则，结果天然按时间排序
+            for rule_id in rule_engine.rules_by_trigger_hour[test_hour]:
+                rule = rule_engine.rules[rule_id]
+                if rule.enabled:
+                    next_triggers.append({
+                        "rule_id": rule_id,
+                        "trigger_time": f"Day {test_day} Hour {test_hour}:00",
+                        "hours_from_now": hour_offset,
+                        "category": rule.category.value
+                    })
         
-        return {
+        return ORJSONResponse(content={
             "success": True,
             "data": {
                 "current_time": f"Day {world.state.day} Hour {current_hour}:00",
-                "next_triggers": next_triggers[:10]  # 只返回前10个
+                "next_triggers": next_triggers[:NEXT_TRIGGER_LIMIT]
             },
             "message": "Next rule triggers calculated"
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -3,67 +3,305 @@ WebSocket handling for real-time communication
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Optional, Set, Iterable, Union
+from pydantic import BaseModel
+from pydantic_core import to_json
+import orjson
 import asyncio
-from core.engine import GameEngine
+import logging
+from core.engine import GameEngine, get_game_engine
 from models.schemas import WorldState
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+GLOBAL_ROOM = "global"  # Every connected client is implicitly a member
+AGENT_ROOM_PREFIX = "agent:"  # "agent:{agent_id}" rooms receive that agent's detail patches
+BROADCAST_DEBOUNCE = 0.05  # seconds; scheduled broadcasts within this window share one frame per room
+FULL_SNAPSHOT_EVERY = 50  # diff broadcasts between full world_update resyncs
+APPEND_ONLY_PATHS = ("event_log",)  # list fields that diffs send as appended items when they only grew
+
+# What a send to a closed or closing socket raises; anything else is worth a log line
+DISCONNECT_ERRORS = (WebSocketDisconnect, RuntimeError, OSError)
+
+# Fields left out of WebSocket world snapshots; thinking history is served by /agents/{id}/memory
+AGENT_BROADCAST_EXCLUDE = {"enhanced_memory": {"thinking_history"}}
+BROADCAST_EXCLUDE = {"agents": {"__all__": AGENT_BROADCAST_EXCLUDE}}
+
+def serialize_world_state(world_state: WorldState) -> str:
+    """Encode the world state for a WebSocket snapshot in a single pydantic-core pass"""
+    return world_state.model_dump_json(exclude=BROADCAST_EXCLUDE)
+
+def encode_state_parts(world_state: WorldState) -> Dict[str, Union[str, bytes]]:
+    """Encode the broadcast world state as {dotted path: JSON}, one entry per agent and per map field"""
+    parts = {}
+    for name in WorldState.model_fields:
+        value = getattr(world_state, name)
+        if name == "agents":
+            for agent_id, agent in value.items():
+                parts[f"agents.{agent_id}"] = agent.model_dump_json(exclude=AGENT_BROADCAST_EXCLUDE)
+        elif isinstance(value, BaseModel):
+            for field in type(value).model_fields:
+                parts[f"{name}.{field}"] = to_json(getattr(value, field))
+        else:
+            parts[name] = to_json(value)
+    return parts
+
+def appended_items(previous: bytes, current: bytes) -> Optional[bytes]:
+    """JSON array of the items `current` adds to `previous`, or None if it is not an extension of it"""
+    if previous == b"[]":
+        return current
+    prefix = previous[:-1] + b","
+    if current.startswith(prefix):
+        return b"[" + current[len(prefix):]
+    return None
+
+def resolve_state_path(world_state: WorldState, path: str) -> orjson.Fragment:
+    """Look up a dotted path such as "agents.guard_001.memory" and return it encoded as JSON"""
+    value = world_state
+    for key in path.split("."):
+        value = value[key] if isinstance(value, dict) else getattr(value, key)
+    return orjson.Fragment(to_json(value))
 
 class ConnectionManager:
     """Manages WebSocket connections"""
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.game_engine = GameEngine()
-        self.game_engine.set_broadcast_callback(self.broadcast_world_state)
+        self.active_connections: Set[WebSocket] = set()
+        self.rooms: Dict[str, Set[WebSocket]] = {}  # e.g. "agent:guard_001" -> subscribed clients
+        self._version = 0  # Bumped by mark_state_changed for edits made outside the engine
+        self._snapshot_frame = None  # (key, encoded world_update message) for the current version
+        self._sent_parts: Optional[Dict[str, Union[str, bytes]]] = None  # encode_state_parts of the last global update
+        self._diffs_since_snapshot = 0
+        self._pending_broadcasts: Dict[str, Optional[Dict[str, None]]] = {}  # room -> ordered paths, None = full snapshot
+        self._pending_world_state: Optional[WorldState] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._game_engine: Optional[GameEngine] = None
+    
+    @property
+    def game_engine(self) -> GameEngine:
+        """The shared engine, built and wired to this manager on first access"""
+        if self._game_engine is None:
+            self._game_engine = get_game_engine()
+            self._game_engine.set_broadcast_callback(self.broadcast_tick)
+        return self._game_engine
     
     async def connect(self, websocket: WebSocket):
         """Accept new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         
         # Send initial world state if available
-        if self.game_engine.get_world_state():
-            await self.send_to_client(websocket, {
-                "type": "world_update",
-                "payload": self.game_engine.get_world_state().dict()
-            })
+        world_state = self.game_engine.get_world_state()
+        if world_state:
+            await self.send_snapshot(websocket, world_state)
     
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        for room in list(self.rooms):
+            self.unsubscribe(websocket, room)
+    
+    def subscribe(self, websocket: WebSocket, room: str):
+        """Add a client to a room, e.g. agent:guard_001"""
+        if room != GLOBAL_ROOM:
+            self.rooms.setdefault(room, set()).add(websocket)
+    
+    def unsubscribe(self, websocket: WebSocket, room: str):
+        """Remove a client from a room, dropping the room once it is empty"""
+        members = self.rooms.get(room)
+        if members is not None:
+            members.discard(websocket)
+            if not members:
+                del self.rooms[room]
+    
+    def _room_members(self, room: str) -> Iterable[WebSocket]:
+        if room == GLOBAL_ROOM:
+            return list(self.active_connections)
+        return list(self.rooms.get(room, ()))
     
     async def send_to_client(self, websocket: WebSocket, message: Dict[str, Any]):
         """Send message to specific client"""
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_text(orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode())
         except Exception as e:
-            print(f"Error sending message to client: {e}")
+            logger.warning("Error sending message to client: %s", e)
+    
+    async def send_frame(self, websocket: WebSocket, frame: str):
+        """Send an already encoded message to a specific client"""
+        try:
+            await websocket.send_text(frame)
+        except Exception as e:
+            logger.warning("Error sending message to client: %s", e)
+    
+    async def send_snapshot(self, websocket: WebSocket, world_state: WorldState):
+        """Send a full world_update to one client"""
+        # That client is now ahead of the last global update, so the next one resyncs everybody
+        self._sent_parts = None
+        await self.send_frame(websocket, self.snapshot_frame(world_state))
+    
+    @property
+    def state_version(self) -> int:
+        """Changes whenever the world state may have changed, including mid-turn actions"""
+        return self._version + self.game_engine.state_version
     
-    async def broadcast_world_state(self, world_state: WorldState):
-        """Broadcast world state to all connected clients"""
-        if not self.active_connections:
+    async def send_room_state(self, websocket: WebSocket, room: str):
+        """Bring a new room member up to date with the state that room patches cover
+        
+        Room-only patches sent before the client joined never reached it, so
+        an agent room starts with a patch of that agent's current state.
+        """
+        if not room.startswith(AGENT_ROOM_PREFIX):
+            return
+        world_state = self.game_engine.get_world_state()
+        agent_id = room[len(AGENT_ROOM_PREFIX):]
+        if not world_state or agent_id not in world_state.agents:
             return
         
-        message = {
-            "type": "world_update",
-            "payload": world_state.dict()
-        }
+        path = f"agents.{agent_id}"
+        agent_json = world_state.agents[agent_id].model_dump_json(exclude=AGENT_BROADCAST_EXCLUDE)
+        await self.send_frame(websocket, orjson.dumps({
+            "type": "patch",
+            "paths": [path],
+            "values": {path: orjson.Fragment(agent_json)}
+        }).decode())
+    
+    def mark_state_changed(self):
+        """Invalidate cached snapshots of the world state"""
+        self._version += 1
+    
+    def snapshot_frame(self, world_state: WorldState) -> str:
+        """Encoded world_update message, serialized at most once per state version and tick"""
+        key = (self.state_version, world_state.session_id, world_state.day,
+               world_state.hour, world_state.minute)
+        if self._snapshot_frame is None or self._snapshot_frame[0] != key:
+            frame = orjson.dumps({
+                "type": "world_update",
+                "payload": orjson.Fragment(serialize_world_state(world_state))
+            }).decode()
+            self._snapshot_frame = (key, frame)
+        return self._snapshot_frame[1]
+    
+    async def broadcast_tick(self, world_state: WorldState):
+        """Engine callback; ticks landing within BROADCAST_DEBOUNCE go out as one update"""
+        self.schedule_broadcast(world_state)
+    
+    def schedule_broadcast(self, world_state: WorldState,
+                           changed_paths: Optional[List[str]] = None,
+                           room: str = GLOBAL_ROOM):
+        """Queue a world state broadcast to `room`; bursts of edits collapse into one frame per room
         
-        # Send to all connected clients
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                disconnected.append(connection)
+        With `changed_paths` only those dotted paths are sent as a "patch"
+        message; otherwise the room gets a full update (for the global room,
+        a diff against the last global update). Patches for the same room are
+        merged and their values read when the queue is flushed, so clients
+        always receive the latest state.
+        """
+        self.mark_state_changed()
+        self._pending_world_state = world_state
+        
+        if changed_paths is None:
+            self._pending_broadcasts[room] = None
+        else:
+            pending = self._pending_broadcasts.setdefault(room, {})
+            if pending is not None:
+                pending.update(dict.fromkeys(changed_paths))
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        await asyncio.sleep(BROADCAST_DEBOUNCE)
+        await self.flush_broadcasts()
+    
+    async def flush_broadcasts(self):
+        """Send everything queued by schedule_broadcast"""
+        pending, self._pending_broadcasts = self._pending_broadcasts, {}
+        world_state, self._pending_world_state = self._pending_world_state, None
+        self._flush_task = None
+        
+        if GLOBAL_ROOM in pending and pending[GLOBAL_ROOM] is None:
+            # Every client is about to get everything changed since the last global update,
+            # which covers the queued room patches too
+            pending = {GLOBAL_ROOM: None}
+        
+        for room, paths in pending.items():
+            await self._send_world_state(world_state, None if paths is None else list(paths), room)
+    
+    async def _send_world_state(self, world_state: WorldState,
+                                changed_paths: Optional[List[str]], room: str):
+        if not self._room_members(room):
+            return
+        
+        if changed_paths is not None:
+            if not changed_paths:
+                return
+            frame = orjson.dumps({
+                "type": "patch",
+                "paths": changed_paths,
+                "values": {path: resolve_state_path(world_state, path) for path in changed_paths}
+            }).decode()
+        elif room == GLOBAL_ROOM:
+            frame = self._diff_frame(world_state)
+            if frame is None:
+                return
+        else:
+            frame = self.snapshot_frame(world_state)
         
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        await self.broadcast_frame(room, frame)
+    
+    def _diff_frame(self, world_state: WorldState) -> Optional[str]:
+        """Patch of the agents and fields that changed since the last global update
+        
+        Falls back to a full world_update for the first update, when agents
+        come or go, and every FULL_SNAPSHOT_EVERY diffs to resync clients.
+        Lists in APPEND_ONLY_PATHS that only grew are sent under "appends"
+        as their new items. Returns None when nothing changed.
+        """
+        parts = encode_state_parts(world_state)
+        previous, self._sent_parts = self._sent_parts, parts
+        
+        if (previous is None or previous.keys() != parts.keys()
+                or self._diffs_since_snapshot >= FULL_SNAPSHOT_EVERY):
+            self._diffs_since_snapshot = 0
+            return self.snapshot_frame(world_state)
+        
+        changed = [path for path, encoded in parts.items() if previous[path] != encoded]
+        if not changed:
+            return None
+        
+        self._diffs_since_snapshot += 1
+        values = {}
+        appends = {}
+        for path in changed:
+            tail = appended_items(previous[path], parts[path]) if path in APPEND_ONLY_PATHS else None
+            if tail is None:
+                values[path] = orjson.Fragment(parts[path])
+            else:
+                appends[path] = orjson.Fragment(tail)
+        
+        message = {"type": "patch", "paths": changed, "values": values}
+        if appends:
+            message["appends"] = appends
+        return orjson.dumps(message).decode()
+    
+    async def broadcast_frame(self, room: str, frame: str):
+        """Send an already encoded message to every client subscribed to `room`
+        
+        Sends run concurrently, so one slow socket does not hold up the rest.
+        """
+        members = self._room_members(room)
+        results = await asyncio.gather(
+            *(connection.send_text(frame) for connection in members),
+            return_exceptions=True
+        )
+        
+        # Remove disconnected clients in the same pass
+        for connection, result in zip(members, results):
+            if isinstance(result, Exception):
+                if not isinstance(result, DISCONNECT_ERRORS):
+                    logger.warning("Dropping client after failed send: %r", result)
+                self.disconnect(connection)
     
     async def handle_client_message(self, websocket: WebSocket, message: Dict[str, Any]):
         """Handle incoming message from client"""
@@ -77,10 +315,19 @@ class ConnectionManager:
         elif message_type == "get_world_state":
             world_state = self.game_engine.get_world_state()
             if world_state:
+                await self.send_snapshot(websocket, world_state)
+        elif message_type in ("subscribe", "unsubscribe"):
+            room = payload.get("room")
+            if not isinstance(room, str) or not room:
                 await self.send_to_client(websocket, {
-                    "type": "world_update",
-                    "payload": world_state.dict()
+                    "type": "error",
+                    "payload": {"message": f"{message_type} requires a room"}
                 })
+            elif message_type == "subscribe":
+                self.subscribe(websocket, room)
+                await self.send_room_state(websocket, room)
+            else:
+                self.unsubscribe(websocket, room)
         else:
             await self.send_to_client(websocket, {
                 "type": "error",
@@ -103,6 +350,7 @@ class ConnectionManager:
         """Stop the simulation"""
         if self.game_engine.is_running:
             self.game_engine.stop_simulation()
+            self.mark_state_changed()  # is_running flipped without a tick
             
             # Broadcast stop notification
             await self.broadcast_message({
@@ -112,16 +360,7 @@ class ConnectionManager:
     
     async def broadcast_message(self, message: Dict[str, Any]):
         """Broadcast generic message to all clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        await self.broadcast_frame(GLOBAL_ROOM, orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode())
 
 # Global connection manager
 manager = ConnectionManager()
@@ -137,15 +376,15 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 await manager.handle_client_message(websocket, message)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 await manager.send_to_client(websocket, {
                     "type": "error",
                     "payload": {"message": "Invalid JSON format"}
                 })
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+    except Exception:
+        logger.exception("WebSocket error")
         manager.disconnect(websocket)
\ No newline at end of file
@@ -4,12 +4,48 @@
 
 from typing import Dict, List, Any, Optional
 from models.schemas import Agent, WorldState
-from models.enums import ActionEnum, RoleEnum, CellTypeEnum
-from dataclasses import dataclass
+from models.enums import ActionEnum, RoleEnum, CellTypeEnum, ItemEnum
+from dataclasses import dataclass, field
+from functools import lru_cache
+import heapq
 import math
+from operator import itemgetter
 
+NEARBY_RADIUS = 2  # 切比雪夫距离内算作"附近"
+MAX_CONTEXTUAL_ACTIONS = 10  # 提供给 LLM 的行为数量上限
+DEFAULT_RELATIONSHIP_SCORE = 50  # 没有关系记录时的中性分数
+HOSTILE_RELATIONSHIP_SCORE = 30  # 低于此分数视为敌对
+SURVIVAL_ITEM_TYPES = frozenset([ItemEnum.FOOD, ItemEnum.WATER, ItemEnum.FIRST_AID])  # 能缓解生存需求的物品
 
-@dataclass
+# 性格特质（0-100 的整数）换算成 0-1 的比例，导入时算好
+TRAIT_FRACTIONS = tuple(value / 100.0 for value in range(101))
+
+# 生存需求优先级的各项加成，按状态值（0-100）查表
+HP_URGENCY = tuple(0.8 if value < 30 else 0.4 if value < 60 else 0.0 for value in range(101))
+# 饥饿、口渴 - 更积极的使用策略，40 以上就开始关注
+NEED_URGENCY = tuple(0.95 if value > 80 else 0.7 if value > 60 else 0.4 if value > 40 else 0.0 for value in range(101))
+SANITY_URGENCY = tuple(0.7 if value < 20 else 0.3 if value < 40 else 0.0 for value in range(101))
+
+# 只有狱警能执行的行为；按角色预先筛掉，不必每次逐个判断
+GUARD_ONLY_ACTIONS = frozenset([
+    ActionEnum.ANNOUNCE_RULE,
+    ActionEnum.PATROL_INSPECT,
+    ActionEnum.ENFORCE_PUNISHMENT,
+    ActionEnum.EMERGENCY_ASSEMBLY,
+])
+
+
+@lru_cache(maxsize=4096)
+def _neighborhood_keys(x: int, y: int) -> tuple:
+    """(x, y) 周围 NEARBY_RADIUS 范围内所有格子的地图键"""
+    return tuple(
+        f"{x + dx},{y + dy}"
+        for dx in range(-NEARBY_RADIUS, NEARBY_RADIUS + 1)
+        for dy in range(-NEARBY_RADIUS, NEARBY_RADIUS + 1)
+    )
+
+
+@dataclass(slots=True)  # 每个代理每次决策都会创建一个，不需要 __dict__
 class BehaviorContext:
     """行为上下文信息"""
     agent: Agent
@@ -18,6 +54,8 @@ class BehaviorContext:
     nearby_items: List[Any]
     current_cell_type: CellTypeEnum
     time_context: Dict[str, Any]
+    nearby_relationship_scores: List[int] = field(default_factory=list)  # 与 nearby_agents 一一对应
+    hostile_nearby: bool = False  # 附近是否有关系分数低于 HOSTILE_RELATIONSHIP_SCORE 的代理
 
 
 class BehaviorFilter:
@@ -47,20 +85,61 @@ class BehaviorFilter:
             ActionEnum.ENFORCE_PUNISHMENT: self._calculate_solitary_priority,
             ActionEnum.EMERGENCY_ASSEMBLY: self._calculate_emergency_priority,
         }
+        
+        # 原因和情境描述只为实际入选的行为生成，按行为查表
+        self.action_reasons = {
+            ActionEnum.ATTACK: self._get_attack_reason,
+            ActionEnum.MOVE: self._get_move_reason,
+            ActionEnum.SPEAK: self._get_speak_reason,
+            ActionEnum.USE_ITEM: self._get_use_item_reason,
+            ActionEnum.GIVE_ITEM: self._get_give_reason,
+            ActionEnum.STEAL_ITEM: self._get_steal_reason,
+            ActionEnum.DO_NOTHING: self._get_rest_reason,
+        }
+        self.context_descriptions = {
+            ActionEnum.ATTACK: lambda context: f"Nearby agents: {len(context.nearby_agents)}, Sanity: {context.agent.sanity}",
+            ActionEnum.MOVE: lambda context: f"Current location: {context.current_cell_type.value}, Time: {context.time_context['hour']}:00",
+            ActionEnum.SPEAK: lambda context: f"Nearby agents: {len(context.nearby_agents)}, Empathy: {context.agent.traits.empathy}",
+            ActionEnum.USE_ITEM: lambda context: f"Inventory: {len(context.agent.inventory)}, HP: {context.agent.hp}",
+        }
+        
+        # 每个角色可能执行的 (行为, 行为名, 优先级函数)，保持上面的顺序
+        self.actions_by_role = {
+            role: tuple(
+                (action_type, action_type.value, priority_func)
+                for action_type, priority_func in self.action_priorities.items()
+                if role == RoleEnum.GUARD or action_type not in GUARD_ONLY_ACTIONS
+            )
+            for role in RoleEnum
+        }
+        
+        # get_contextual_actions 是同步的，上下文只在一次调用内有效，所以复用同一个对象和列表
+        self._context = BehaviorContext(
+            agent=None,
+            world_state=None,
+            nearby_agents=[],
+            nearby_items=[],
+            current_cell_type=CellTypeEnum.CELL_BLOCK,
+            time_context={}
+        )
     
     def get_contextual_actions(self, agent: Agent, world_state: WorldState) -> List[Dict[str, Any]]:
         """获取基于情境的可执行行为列表"""
+        # 没有行动点时任何行为都不可执行，不必构建上下文
+        if agent.action_points <= 0:
+            return []
+        
         context = self._build_context(agent, world_state)
         available_actions = []
         
-        for action_type, priority_func in self.action_priorities.items():
-            # 检查基本可执行性
+        for action_type, action_name, priority_func in self.actions_by_role[agent.role]:
+            # 检查基本可执行性（角色权限已由 actions_by_role 筛过）
             if self._is_action_executable(action_type, context):
                 priority = priority_func(context)
                 
                 if priority > 0:
                     action_info = {
-                        "action_type": action_type.value,
+                        "action_type": action_name,
                         "priority": priority,
                         "reason": self._get_action_reason(action_type, context),
                         "parameters": self._get_suggested_parameters(action_type, context),
@@ -68,53 +147,51 @@ class BehaviorFilter:
                     }
                     available_actions.append(action_info)
         
-        # 按优先级排序
-        available_actions.sort(key=lambda x: x["priority"], reverse=True)
-        
-        # 返回前10个最相关的行为
-        return available_actions[:10]
+        # 按优先级取前 MAX_CONTEXTUAL_ACTIONS 个最相关的行为（与稳定降序排序后切片等价）
+        return heapq.nlargest(MAX_CONTEXTUAL_ACTIONS, available_actions, key=itemgetter("priority"))
     
     def _build_context(self, agent: Agent, world_state: WorldState) -> BehaviorContext:
-        """构建行为上下文"""
+        """构建行为上下文（复用的对象，下次调用时会被覆盖）"""
+        context = self._context
         agent_x, agent_y = agent.position
-        nearby_agents = []
-        nearby_items = []
-        
-        # 找到附近的代理
+        relationships = agent.relationships
+        nearby_agents = context.nearby_agents
+        nearby_scores = context.nearby_relationship_scores
+        nearby_items = context.nearby_items
+        nearby_agents.clear()
+        nearby_scores.clear()
+        nearby_items.clear()
+        
+        # 找到附近的代理（2格内）；代理在同一回合内逐个行动、位置随时变化，直接按坐标范围筛选
         for other_agent in world_state.agents.values():
             if other_agent.agent_id == agent.agent_id:
                 continue
             
             other_x, other_y = other_agent.position
-            distance = max(abs(agent_x - other_x), abs(agent_y - other_y))
-            
-            if distance <= 2:  # 2格内的代理
+            if -NEARBY_RADIUS <= other_x - agent_x <= NEARBY_RADIUS and -NEARBY_RADIUS <= other_y - agent_y <= NEARBY_RADIUS:
                 nearby_agents.append(other_agent)
+                relationship = relationships.get(other_agent.agent_id)
+                nearby_scores.append(relationship.score if relationship else DEFAULT_RELATIONSHIP_SCORE)
         
-        # 找到附近的物品
-        for pos, items in world_state.game_map.items.items():
-            pos_x, pos_y = map(int, pos.split(','))
-            distance = max(abs(agent_x - pos_x), abs(agent_y - pos_y))
-            
-            if distance <= 2:
-                nearby_items.extend(items)
+        # 找到附近的物品：地图物品本身按 "x,y" 索引，只查周围 5x5 格子，不必遍历并解析所有坐标
+        map_items = world_state.game_map.items
+        if map_items:
+            for pos in _neighborhood_keys(agent_x, agent_y):
+                items = map_items.get(pos)
+                if items:
+                    nearby_items.extend(items)
         
         # 获取当前位置的单元格类型
         current_cell_key = f"{agent_x},{agent_y}"
-        current_cell_type = world_state.game_map.cells.get(current_cell_key, CellTypeEnum.CELL_BLOCK)
-        
-        return BehaviorContext(
-            agent=agent,
-            world_state=world_state,
-            nearby_agents=nearby_agents,
-            nearby_items=nearby_items,
-            current_cell_type=current_cell_type,
-            time_context={
-                "day": world_state.day,
-                "hour": world_state.hour,
-                "is_night": world_state.hour >= 22 or world_state.hour <= 6
-            }
-        )
+        
+        context.agent = agent
+        context.world_state = world_state
+        context.current_cell_type = world_state.game_map.cells.get(current_cell_key, CellTypeEnum.CELL_BLOCK)
+        context.time_context["day"] = world_state.day
+        context.time_context["hour"] = world_state.hour
+        context.time_context["is_night"] = world_state.hour >= 22 or world_state.hour <= 6
+        context.hostile_nearby = any(score < HOSTILE_RELATIONSHIP_SCORE for score in nearby_scores)
+        return context
     
     def _is_action_executable(self, action_type: ActionEnum, context: BehaviorContext) -> bool:
         """检查行为是否可执行"""
@@ -125,16 +202,7 @@ class BehaviorFilter:
             return False
         
         # 检查角色特定权限
-        if action_type == ActionEnum.ANNOUNCE_RULE and agent.role != RoleEnum.GUARD:
-            return False
-        
-        if action_type == ActionEnum.PATROL_INSPECT and agent.role != RoleEnum.GUARD:
-            return False
-        
-        if action_type == ActionEnum.ENFORCE_PUNISHMENT and agent.role != RoleEnum.GUARD:
-            return False
-        
-        if action_type == ActionEnum.EMERGENCY_ASSEMBLY and agent.role != RoleEnum.GUARD:
+        if action_type in GUARD_ONLY_ACTIONS and agent.role != RoleEnum.GUARD:
             return False
         
         # 检查是否有目标
@@ -153,42 +221,13 @@ class BehaviorFilter:
     def _calculate_survival_priority(self, context: BehaviorContext) -> float:
         """计算生存需求优先级"""
         agent = context.agent
-        priority = 0.0
         
-        # 健康状态紧急程度
-        if agent.hp < 30:
-            priority += 0.8
-        elif agent.hp < 60:
-            priority += 0.4
-        
-        # 饥饿程度 - 更积极的使用策略
-        if agent.hunger > 80:
-            priority += 0.95  # 非常紧急
-        elif agent.hunger > 60:
-            priority += 0.7   # 提高优先级
-        elif agent.hunger > 40:
-            priority += 0.4   # 新增：提早开始关注
-        
-        # 口渴程度 - 更积极的使用策略
-        if agent.thirst > 80:
-            priority += 0.95  # 非常紧急
-        elif agent.thirst > 60:
-            priority += 0.7   # 提高优先级
-        elif agent.thirst > 40:
-            priority += 0.4   # 新增：提早开始关注
-        
-        # 精神状态
-        if agent.sanity < 20:
-            priority += 0.7
-        elif agent.sanity < 40:
-            priority += 0.3
+        # 健康、饥饿、口渴、精神状态的紧急程度
+        priority = (HP_URGENCY[agent.hp] + NEED_URGENCY[agent.hunger]
+                    + NEED_URGENCY[agent.thirst] + SANITY_URGENCY[agent.sanity])
         
         # 检查是否有相关物品
-        from models.enums import ItemEnum
-        has_relevant_item = any(
-            item.item_type in [ItemEnum.FOOD, ItemEnum.WATER, ItemEnum.FIRST_AID]
-            for item in agent.inventory
-        )
+        has_relevant_item = any(item.item_type in SURVIVAL_ITEM_TYPES for item in agent.inventory)
         
         if has_relevant_item:
             priority += 0.2
@@ -213,12 +252,7 @@ class BehaviorFilter:
             priority -= 0.2  # 夜晚移动欲望降低
         
         # 附近威胁
-        hostile_nearby = any(
-            (agent.relationships.get(other.agent_id).score if agent.relationships.get(other.agent_id) else 50) < 30
-            for other in context.nearby_agents
-        )
-        
-        if hostile_nearby:
+        if context.hostile_nearby:
             priority += 0.4  # 遇到敌对者想要离开
         
         return min(priority, 1.0)
@@ -229,7 +263,7 @@ class BehaviorFilter:
         priority = 0.0
         
         # 基础攻击性
-        base_aggression = agent.traits.aggression / 100.0
+        base_aggression = TRAIT_FRACTIONS[agent.traits.aggression]
         priority += base_aggression * 0.3
         
         # 精神状态影响
@@ -241,9 +275,7 @@ class BehaviorFilter:
             priority -= 0.3  # 健康不佳降低攻击欲望
         
         # 关系影响
-        for other in context.nearby_agents:
-            relationship = agent.relationships.get(other.agent_id)
-            relationship_score = relationship.score if relationship else 50
+        for relationship_score in context.nearby_relationship_scores:
             if relationship_score < 20:
                 priority += 0.4  # 对敌对者攻击欲望高
             elif relationship_score < 40:
@@ -266,7 +298,7 @@ class BehaviorFilter:
         priority = 0.3  # 基础社交需求
         
         # 共情能力影响
-        empathy_factor = agent.traits.empathy / 100.0
+        empathy_factor = TRAIT_FRACTIONS[agent.traits.empathy]
         priority += empathy_factor * 0.3
         
         # 精神状态影响
@@ -292,7 +324,6 @@ class BehaviorFilter:
         agent = context.agent
         priority = 0.0
         
-        from models.enums import ItemEnum
         for item in context.nearby_items:
             if item.item_type == ItemEnum.FOOD and agent.hunger > 50:
                 priority += 0.6
@@ -310,7 +341,7 @@ class BehaviorFilter:
         if not context.nearby_agents or not context.agent.inventory:
             return 0.0
         
-        empathy_factor = context.agent.traits.empathy / 100.0
+        empathy_factor = TRAIT_FRACTIONS[context.agent.traits.empathy]
         return empathy_factor * 0.4
     
     def _calculate_alliance_priority(self, context: BehaviorContext) -> float:
@@ -382,17 +413,8 @@ class BehaviorFilter:
     
     def _get_action_reason(self, action_type: ActionEnum, context: BehaviorContext) -> str:
         """获取行为的原因描述"""
-        reasons = {
-            ActionEnum.ATTACK: self._get_attack_reason(context),
-            ActionEnum.MOVE: self._get_move_reason(context),
-            ActionEnum.SPEAK: self._get_speak_reason(context),
-            ActionEnum.USE_ITEM: self._get_use_item_reason(context),
-            ActionEnum.GIVE_ITEM: self._get_give_reason(context),
-            ActionEnum.STEAL_ITEM: self._get_steal_reason(context),
-            ActionEnum.DO_NOTHING: self._get_rest_reason(context),
-        }
-        
-        return reasons.get(action_type, "Situational decision")
+        reason_func = self.action_reasons.get(action_type)
+        return reason_func(context) if reason_func else "Situational decision"
     
     def _get_attack_reason(self, context: BehaviorContext) -> str:
         """获取攻击的具体原因"""
@@ -407,17 +429,12 @@ class BehaviorFilter:
             reasons.append("I'm dying of thirst")
         
         # 检查关系
-        def get_relationship_score(agent, other_agent_id):
-            relationship = agent.relationships.get(other_agent_id)
-            return relationship.score if relationship else 50
-            
-        hostile_targets = [
-            other for other in context.nearby_agents
-            if get_relationship_score(agent, other.agent_id) < 30
-        ]
-        
-        if hostile_targets:
-            reasons.append(f"I have issues with {hostile_targets[0].name}")
+        if context.hostile_nearby:
+            hostile_target = next(
+                other for other, score in zip(context.nearby_agents, context.nearby_relationship_scores)
+                if score < HOSTILE_RELATIONSHIP_SCORE
+            )
+            reasons.append(f"I have issues with {hostile_target.name}")
         
         if not reasons:
             reasons.append("I need to defend myself")
@@ -485,12 +502,9 @@ class BehaviorFilter:
         params = {}
         
         if action_type == ActionEnum.ATTACK and context.nearby_agents:
-            # 选择关系最差的目标
-            def get_relationship_score(agent_id):
-                relationship = context.agent.relationships.get(agent_id)
-                return relationship.score if relationship else 50
-                
-            target = min(context.nearby_agents, key=lambda x: get_relationship_score(x.agent_id))
+            # 选择关系最差的目标（分数已在 _build_context 中算好）
+            scores = context.nearby_relationship_scores
+            target = context.nearby_agents[min(range(len(scores)), key=scores.__getitem__)]
             params["target_id"] = target.agent_id
             params["reason"] = self._get_attack_reason(context)
         
@@ -512,7 +526,6 @@ class BehaviorFilter:
         
         elif action_type == ActionEnum.USE_ITEM and context.agent.inventory:
             # 选择最需要的物品 - 降低使用阈值，更早使用道具
-            from models.enums import ItemEnum
             best_item = None
             if context.agent.hunger > 50:  # 降低阈值从70到50
                 best_item = next((item for item in context.agent.inventory if item.item_type == ItemEnum.FOOD), None)
@@ -528,11 +541,5 @@ class BehaviorFilter:
     
     def _get_context_description(self, action_type: ActionEnum, context: BehaviorContext) -> str:
         """获取行为的情境描述"""
-        descriptions = {
-            ActionEnum.ATTACK: f"Nearby agents: {len(context.nearby_agents)}, Sanity: {context.agent.sanity}",
-            ActionEnum.MOVE: f"Current location: {context.current_cell_type.value}, Time: {context.time_context['hour']}:00",
-            ActionEnum.SPEAK: f"Nearby agents: {len(context.nearby_agents)}, Empathy: {context.agent.traits.empathy}",
-            ActionEnum.USE_ITEM: f"Inventory: {len(context.agent.inventory)}, HP: {context.agent.hp}",
-        }
-        
-        return descriptions.get(action_type, "Contextual action")
\ No newline at end of file
+        describe = self.context_descriptions.get(action_type)
+        return describe(context) if describe else "Contextual action"
\ No newline at end of file
@@ -4,15 +4,44 @@ Time management system for Project Prometheus
 
 from models.schemas import WorldState
 from database.event_logger import event_logger
+from functools import lru_cache
 import json
 
+EPISODIC_MEMORY_LIMIT = 500  # Newest entries kept in agent.memory["episodic"]
+NEGATIVE_STATUS_TAGS = frozenset(["hungry", "thirsty", "injured", "exhausted"])  # Each costs sanity every hour
+
+# Hourly HP damage indexed by hunger / thirst (0-100), precomputed from the progressive formulas:
+# hunger above 80 costs (hunger - 80)^2 / 40, capped at 15; thirst above 75 costs (thirst - 75)^2 / 30, capped at 20
+HUNGER_DAMAGE = tuple(min(15, (value - 80) ** 2 / 40) if value > 80 else 0 for value in range(101))
+THIRST_DAMAGE = tuple(min(20, (value - 75) ** 2 / 30) if value > 75 else 0 for value in range(101))
+# Episodic memory line for each possible hourly loss; shared strings instead of one f-string per agent per hour
+HP_LOSS_MEMORIES = tuple(f"Lost {loss} HP due to hunger/thirst" for loss in range(int(HUNGER_DAMAGE[100] + THIRST_DAMAGE[100]) + 1))
+
+# Status tag for each stat value (0-100), None below the first threshold
+HUNGER_TAGS = tuple("starving" if value > 90 else "very_hungry" if value > 80 else "hungry" if value > 60 else None
+                    for value in range(101))
+THIRST_TAGS = tuple("dehydrated" if value > 85 else "very_thirsty" if value > 75 else "thirsty" if value > 55 else None
+                    for value in range(101))
+HEALTH_TAGS = tuple("critical" if value < 20 else "injured" if value < 40 else "wounded" if value < 60 else None
+                    for value in range(101))
+MENTAL_TAGS = tuple("unhinged" if value < 20 else "unstable" if value < 40 else "stressed" if value < 60 else None
+                    for value in range(101))
+
+@lru_cache(maxsize=1)
+def _load_rules():
+    """Parse configs/game_rules.json once; every TimeController shares the result (read-only)"""
+    with open('configs/game_rules.json', 'r') as f:
+        return json.load(f)
+
 class TimeController:
     def __init__(self):
-        self.rules = self._load_rules()
-    
-    def _load_rules(self):
-        with open('configs/game_rules.json', 'r') as f:
-            return json.load(f)
+        self.rules = _load_rules()
+        
+        # Per-hour rates, read once instead of per agent per tick
+        status_rules = self.rules["status_rules"]
+        self.hunger_per_hour = status_rules["hunger_increase_per_hour"]
+        self.thirst_per_hour = status_rules["thirst_increase_per_hour"]
+        self.sanity_per_bad_tag = status_rules["sanity_penalty_per_bad_tag"]
     
     def advance_time(self, world_state: WorldState):
         """Advance time by 1 hour and apply status changes"""
@@ -34,36 +63,40 @@ class TimeController:
             world_state.event_log.append(f"⚠️ Rule engine error: {str(e)}")
         
         # Apply hourly status changes to all agents
-        for agent in world_state.agents.values():
-            self._apply_hourly_changes(agent)
+        deaths = [agent for agent in world_state.agents.values() if self._apply_hourly_changes(agent)]
+        
+        # Record death events for milestones in one write per tick
+        if deaths and world_state.session_id:
+            event_logger.log_events_bulk([
+                {
+                    "session_id": world_state.session_id,
+                    "day": world_state.day,
+                    "hour": world_state.hour,
+                    "minute": world_state.minute,
+                    "agent_id": agent.agent_id,
+                    "agent_name": agent.name,
+                    "event_type": "death",
+                    "description": f"{agent.name} has died from hunger, thirst, or injuries",
+                    "details": f'{{"hp": {agent.hp}, "hunger": {agent.hunger}, "thirst": {agent.thirst}}}'
+                }
+                for agent in deaths
+            ])
+            world_state.event_log.extend(f"💀 {agent.name} has died" for agent in deaths)
     
-    def _apply_hourly_changes(self, agent):
-        """Apply hourly status degradation"""
+    def _apply_hourly_changes(self, agent) -> bool:
+        """Apply hourly status degradation; returns True if the agent died this hour"""
         # Increase hunger and thirst
-        agent.hunger = min(100, agent.hunger + self.rules["status_rules"]["hunger_increase_per_hour"])
-        agent.thirst = min(100, agent.thirst + self.rules["status_rules"]["thirst_increase_per_hour"])
-        
-        # Apply hunger and thirst HP penalties (progressive damage algorithm)
-        hp_penalty = 0
-        
-        # Hunger HP damage (critical after 80, severe after 90)
-        if agent.hunger > 80:
-            # Progressive damage: (hunger - 80)^2 / 40
-            excess_hunger = agent.hunger - 80
-            hunger_damage = (excess_hunger ** 2) / 40
-            hp_penalty += min(15, hunger_damage)  # Cap at 15 HP per hour
-        
-        # Thirst HP damage (critical after 75, severe after 85)
-        if agent.thirst > 75:
-            # Progressive damage: (thirst - 75)^2 / 30 (thirst is more critical)
-            excess_thirst = agent.thirst - 75
-            thirst_damage = (excess_thirst ** 2) / 30
-            hp_penalty += min(20, thirst_damage)  # Cap at 20 HP per hour
+        agent.hunger = min(100, agent.hunger + self.hunger_per_hour)
+        agent.thirst = min(100, agent.thirst + self.thirst_per_hour)
+        
+        # Apply hunger and thirst HP penalties (progressive damage, see HUNGER_DAMAGE / THIRST_DAMAGE)
+        hp_penalty = HUNGER_DAMAGE[agent.hunger] + THIRST_DAMAGE[agent.thirst]
         
         # Apply HP damage
         if hp_penalty > 0:
-            agent.hp = max(0, agent.hp - int(hp_penalty))
-            agent.memory["episodic"].append(f"Lost {int(hp_penalty)} HP due to hunger/thirst")
+            hp_loss = int(hp_penalty)
+            agent.hp = max(0, agent.hp - hp_loss)
+            agent.memory["episodic"].append(HP_LOSS_MEMORIES[hp_loss])
         
         # Apply sanity penalties
         sanity_penalty = 0
@@ -71,71 +104,41 @@ class TimeController:
         # Penalty for being in solitary
         # Note: This would need position-to-cell-type mapping
         
-        # Penalty for negative status tags
-        negative_tags = ["hungry", "thirsty", "injured", "exhausted"]
+        # Penalty for negative status tags (tags may have been set by hand, so compare lowercased)
         for tag in agent.status_tags:
-            if tag.lower() in negative_tags:
-                sanity_penalty += self.rules["status_rules"]["sanity_penalty_per_bad_tag"]
+            if tag.lower() in NEGATIVE_STATUS_TAGS:
+                sanity_penalty += self.sanity_per_bad_tag
         
         agent.sanity = max(0, agent.sanity - sanity_penalty)
         
         # Update status tags based on current values
-        self._update_status_tags(agent)
+        died = self._update_status_tags(agent)
         
         # Reset action points
         agent.action_points = min(3, 3 - max(0, (100 - agent.hp) // 25))  # Reduced AP if low HP
+        
+        # Drop the oldest episodic memories in place so snapshots and prompts stay bounded
+        episodic = agent.memory["episodic"]
+        if len(episodic) > EPISODIC_MEMORY_LIMIT:
+            del episodic[:-EPISODIC_MEMORY_LIMIT]
+        
+        return died
     
-    def _update_status_tags(self, agent):
-        """Update status tags based on current values"""
-        agent.status_tags = []
-        
-        # Hunger status tags
-        if agent.hunger > 90:
-            agent.status_tags.append("starving")
-        elif agent.hunger > 80:
-            agent.status_tags.append("very_hungry")
-        elif agent.hunger > 60:
-            agent.status_tags.append("hungry")
-        
-        # Thirst status tags
-        if agent.thirst > 85:
-            agent.status_tags.append("dehydrated")
-        elif agent.thirst > 75:
-            agent.status_tags.append("very_thirsty")
-        elif agent.thirst > 55:
-            agent.status_tags.append("thirsty")
-        
-        # Health status tags
-        if agent.hp < 20:
-            agent.status_tags.append("critical")
-        elif agent.hp < 40:
-            agent.status_tags.append("injured")
-        elif agent.hp < 60:
-            agent.status_tags.append("wounded")
-        
-        # Mental status tags
-        if agent.sanity < 20:
-            agent.status_tags.append("unhinged")
-        elif agent.sanity < 40:
-            agent.status_tags.append("unstable")
-        elif agent.sanity < 60:
-            agent.status_tags.append("stressed")
-        
-        # Death state
+    def _update_status_tags(self, agent) -> bool:
+        """Update status tags based on current values; returns True if the agent just became deceased"""
+        # Hunger, thirst, health and mental tags, looked up by stat value
+        status_tags = [
+            tag for tag in (HUNGER_TAGS[agent.hunger], THIRST_TAGS[agent.thirst],
+                            HEALTH_TAGS[agent.hp], MENTAL_TAGS[agent.sanity])
+            if tag
+        ]
+        
+        # Only replace the list when an agent crossed a threshold; most hours nothing changes
+        already_dead = "deceased" in agent.status_tags
         if agent.hp <= 0:
-            agent.status_tags.append("deceased")
-            
-            # Record death event for milestones
-            if world_state.session_id:
-                event_logger.log_event(
-                    session_id=world_state.session_id,
-                    day=world_state.day,
-                    hour=world_state.hour,
-                    minute=world_state.minute,
-                    agent_id=agent.agent_id,
-                    agent_name=agent.name,
-                    event_type="death",
-                    description=f"{agent.name} has died from hunger, thirst, or injuries",
-                    details=f'{{"hp": {agent.hp}, "hunger": {agent.hunger}, "thirst": {agent.thirst}}}'
-                )
-                world_state.event_log.append(f"💀 {agent.name} has died")
\ No newline at end of file
+            status_tags.append("deceased")
+        if status_tags != agent.status_tags:
+            agent.status_tags = status_tags
+        
+        # Death state; advance_time records the event once per death
+        return agent.hp <= 0 and not already_dead
@@ -3,16 +3,19 @@ Core game engine for Project Prometheus
 """
 
 import asyncio
-import random
-from typing import Dict, Any, List
-from models.schemas import WorldState, Agent, ActionResult
-from models.actions import ACTION_REGISTRY
-from models.enums import ActionEnum
+from functools import lru_cache
+from models.schemas import WorldState, ActionResult
+from models.actions import ACTION_INSTANCES
 from core.world import World
 from core.clock import TimeController
 from core.session_manager import session_manager
 from services.llm_service_enhanced import EnhancedLLMService
 
+# The in-memory event log keeps only recent entries; the full history is in the events database.
+# It is trimmed in batches, since every trim makes the next broadcast resend the whole log.
+EVENT_LOG_LIMIT = 2000
+EVENT_LOG_TRIM_SLACK = 200
+
 class GameEngine:
     """Main game loop engine"""
     
@@ -23,6 +26,7 @@ class GameEngine:
         self.is_running = False
         self.turn_delay = 2.0  # seconds between turns
         self.broadcast_callback = None
+        self.state_version = 0  # Bumped whenever the engine mutates the world (new world, tick, applied action)
     
     def set_broadcast_callback(self, callback):
         """Set callback function for broadcasting state updates"""
@@ -37,6 +41,7 @@ class GameEngine:
         """Start the simulation loop with optional agent counts and duration"""
         # Always reinitialize world state for new experiment
         self.world.initialize_world(guard_count, prisoner_count)
+        self.state_version += 1
         
         # Start new session for this experiment
         session_id = session_manager.start_new_session()
@@ -105,48 +110,60 @@ class GameEngine:
         
         # Phase 1: Environment update
         self.clock.advance_time(self.world.state)
+        self.state_version += 1
         
-        # Phase 2: Agent actions (sequential)
-        agent_ids = list(self.world.state.agents.keys())
-        # Sort to ensure consistent order: guards first, then prisoners
-        agent_ids.sort(key=lambda x: (0 if x.startswith('guard') else 1, x))
+        # Phase 2: Agent actions, in the world's guards-first turn order
+        agents = self.world.state.agents
+        # Skip agents that are dead or incapacitated
+        alive_ids = [agent_id for agent_id in self.world.turn_order if agents[agent_id].hp > 0]
         
         # Check if all agents are dead/incapacitated
-        alive_agents = [agent for agent in self.world.state.agents.values() if agent.hp > 0]
-        if not alive_agents:
+        if not alive_ids:
             self.world.state.event_log.append("⚠️ ALL AGENTS INCAPACITATED - Simulation continuing with empty turns")
         
-        active_agents_this_turn = 0
         successful_actions_this_turn = 0
         
-        for agent_id in agent_ids:
-            agent = self.world.state.agents[agent_id]
-            
-            # Skip if agent is dead or incapacitated
-            if agent.hp <= 0:
-                continue
+        # Agents take actions until AP is exhausted. Each round gathers the LLM
+        # decisions concurrently, then applies them one by one in turn order.
+        turn_actions_taken = {agent_id: [] for agent_id in alive_ids}  # Track actions taken this turn
+        
+        acting_ids = alive_ids
+        while acting_ids:
+            acting_ids = [
+                agent_id for agent_id in acting_ids
+                if agents[agent_id].hp > 0 and agents[agent_id].action_points > 0
+            ]
+            if not acting_ids:
+                break
             
-            active_agents_this_turn += 1
+            decisions = await asyncio.gather(
+                *(self._propose_action(agent_id, turn_actions_taken[agent_id]) for agent_id in acting_ids),
+                return_exceptions=True
+            )
             
-            # Agent takes actions until AP is exhausted
-            turn_actions_taken = []  # Track actions taken this turn
-            while agent.action_points > 0:
-                action_result = await self._execute_agent_action(agent_id, turn_actions_taken)
+            still_acting = []
+            for agent_id, decision in zip(acting_ids, decisions):
+                # Skip agents incapacitated earlier in this round
+                if agents[agent_id].hp <= 0:
+                    continue
+                action_result = self._apply_action(agent_id, decision)
                 if not action_result.success:
-                    break  # If action fails, skip remaining actions
-                    
+                    continue  # If action fails, skip remaining actions
+                still_acting.append(agent_id)
+                
                 # Track the action taken this turn
                 if hasattr(action_result, 'action_type'):
-                    turn_actions_taken.append(action_result.action_type)
+                    turn_actions_taken[agent_id].append(action_result.action_type)
                 
                 # Check if this was a real action (not just an LLM failure)
                 if "LLM ERROR" not in action_result.message:
                     successful_actions_this_turn += 1
                     # Update last agent action time
                     self.world.state.last_agent_action_time = (self.world.state.day - 1) * 24 + self.world.state.hour
+            acting_ids = still_acting
         
         # Log if no agents took successful actions this turn
-        if active_agents_this_turn == 0:
+        if not alive_ids:
             self.world.state.event_log.append(f"⚠️ No active agents on Day {self.world.state.day}, Hour {self.world.state.hour}")
         elif successful_actions_this_turn == 0:
             self.world.state.event_log.append(f"⚠️ No successful agent actions on Day {self.world.state.day}, Hour {self.world.state.hour} (LLM failures)")
@@ -155,30 +172,49 @@ class GameEngine:
         if not hasattr(self.world.state, 'last_agent_action_time'):
             self.world.state.last_agent_action_time = (self.world.state.day - 1) * 24 + self.world.state.hour
         
+        event_log = self.world.state.event_log
+        if len(event_log) > EVENT_LOG_LIMIT + EVENT_LOG_TRIM_SLACK:
+            del event_log[:-EVENT_LOG_LIMIT]
+        
         # Phase 3: Broadcast updated state
         await self._broadcast_state()
     
-    async def _execute_agent_action(self, agent_id: str, turn_actions_taken: list = None) -> ActionResult:
-        """Execute a single agent action using LLM or fallback to random"""
+    async def _propose_action(self, agent_id: str, turn_actions_taken: list = None):
+        """Ask the LLM for an agent's next action; only its prompt and thinking records change"""
+        if not self.llm_service.is_available():
+            return None
+        
         agent = self.world.state.agents[agent_id]
         if turn_actions_taken is None:
             turn_actions_taken = []
         
-        # Try to get LLM decision first
+        try:
+            return await self.llm_service.get_agent_decision(agent, self.world.state, turn_actions_taken)
+        except Exception as e:
+            return e
+        finally:
+            # The service stores the prompt, thinking and decision on the world state
+            self.state_version += 1
+    
+    def _apply_action(self, agent_id: str, llm_decision) -> ActionResult:
+        """Validate and execute a proposed action against the world state"""
+        agent = self.world.state.agents[agent_id]
+        
         if self.llm_service.is_available():
             try:
-                llm_decision = await self.llm_service.get_agent_decision(agent, self.world.state, turn_actions_taken)
+                if isinstance(llm_decision, Exception):
+                    raise llm_decision
                 
                 if llm_decision:
                     action_type = llm_decision["action_type"]
                     kwargs = llm_decision["parameters"]
                     
-                    action_class = ACTION_REGISTRY[action_type]
-                    action = action_class()
+                    action = ACTION_INSTANCES[action_type]
                     
                     # Execute LLM-decided action
                     if action.can_execute(self.world.state, agent_id, **kwargs):
                         result = action.execute(self.world.state, agent_id, **kwargs)
+                        self.state_version += 1
                         if result.success:
                             self.world.state.event_log.append(f"[Enhanced LLM] {agent.name} performed {action_type.value}")
                         return result
@@ -198,128 +234,6 @@ class GameEngine:
         # Return successful result but with no action taken
         return ActionResult(success=True, message=f"LLM failed for {agent.name} - agent skipped turn")
     
-    def _get_available_actions(self, agent: Agent) -> List[ActionEnum]:
-        """Get list of available actions for an agent"""
-        available = [ActionEnum.DO_NOTHING]
-        
-        # Always allow movement
-        available.append(ActionEnum.MOVE)
-        
-        # Allow speaking if there are other agents nearby
-        if self._has_nearby_agents(agent):
-            available.append(ActionEnum.SPEAK)
-            available.append(ActionEnum.ATTACK)
-        
-        # Allow item use if agent has items
-        if agent.inventory:
-            available.append(ActionEnum.USE_ITEM)
-        
-        return available
-    
-    def _has_nearby_agents(self, agent: Agent) -> bool:
-        """Check if there are other agents within 2 cells"""
-        agent_x, agent_y = agent.position
-        
-        for other_agent in self.world.state.agents.values():
-            if other_agent.agent_id == agent.agent_id:
-                continue
-            
-            other_x, other_y = other_agent.position
-            distance = max(abs(agent_x - other_x), abs(agent_y - other_y))
-            
-            if distance <= 2:
-                return True
-        
-        return False
-    
-    def _generate_action_parameters(self, action_type: ActionEnum, agent_id: str) -> Dict[str, Any]:
-        """Generate random parameters for actions"""
-        agent = self.world.state.agents[agent_id]
-        kwargs = {}
-        
-        if action_type == ActionEnum.MOVE:
-            # Random adjacent position
-            x, y = agent.position
-            possible_moves = [
-                (x-1, y-1), (x, y-1), (x+1, y-1),
-                (x-1, y), (x+1, y),
-                (x-1, y+1), (x, y+1), (x+1, y+1)
-            ]
-            
-            # Filter valid moves
-            valid_moves = []
-            for mx, my in possible_moves:
-                if 0 <= mx < self.world.state.game_map.width and 0 <= my < self.world.state.game_map.height:
-                    # Check if position is not occupied
-                    occupied = False
-                    for other_agent in self.world.state.agents.values():
-                        if other_agent.agent_id != agent_id and other_agent.position == (mx, my):
-                            occupied = True
-                            break
-                    if not occupied:
-                        valid_moves.append((mx, my))
-            
-            if valid_moves:
-                target_x, target_y = random.choice(valid_moves)
-                kwargs['x'] = target_x
-                kwargs['y'] = target_y
-        
-        elif action_type == ActionEnum.SPEAK:
-            # Find nearby agents
-            nearby_agents = []
-            agent_x, agent_y = agent.position
-            
-            for other_agent in self.world.state.agents.values():
-                if other_agent.agent_id == agent_id:
-                    continue
-                
-                other_x, other_y = other_agent.position
-                distance = max(abs(agent_x - other_x), abs(agent_y - other_y))
-                
-                if distance <= 2:
-                    nearby_agents.append(other_agent.agent_id)
-            
-            if nearby_agents:
-                kwargs['target_id'] = random.choice(nearby_agents)
-                kwargs['message'] = random.choice([
-                    "How are you doing?",
-                    "This place is getting to me.",
-                    "Stay out of my way.",
-                    "Want to team up?",
-                    "I need some food.",
-                    "The guards are watching us."
-                ])
-        
-        elif action_type == ActionEnum.ATTACK:
-            # Find nearby agents
-            nearby_agents = []
-            agent_x, agent_y = agent.position
-            
-            for other_agent in self.world.state.agents.values():
-                if other_agent.agent_id == agent_id:
-                    continue
-                
-                other_x, other_y = other_agent.position
-                distance = max(abs(agent_x - other_x), abs(agent_y - other_y))
-                
-                if distance <= 2:
-                    nearby_agents.append(other_agent.agent_id)
-            
-            if nearby_agents:
-                kwargs['target_id'] = random.choice(nearby_agents)
-                kwargs['reason'] = random.choice([
-                    "They looked at me wrong",
-                    "I don't like their attitude",
-                    "They're in my way",
-                    "I need to establish dominance"
-                ])
-        
-        elif action_type == ActionEnum.USE_ITEM:
-            if agent.inventory:
-                kwargs['item_id'] = random.choice(agent.inventory).item_id
-        
-        return kwargs
-    
     async def _broadcast_state(self):
         """Broadcast current world state"""
         if self.broadcast_callback:
@@ -327,4 +241,10 @@ class GameEngine:
     
     def get_world_state(self) -> WorldState:
         """Get current world state"""
-        return self.world.state if self.world.state else None
\ No newline at end of file
+        return self.world.state if self.world.state else None
+
+
+@lru_cache(maxsize=1)
+def get_game_engine() -> GameEngine:
+    """The application's single GameEngine, created on first use"""
+    return GameEngine()
@@ -4,9 +4,11 @@ Elegant Rule Engine for Project Prometheus
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, FrozenSet, Iterable
 from dataclasses import dataclass
 from enum import Enum
+from collections import deque
+from itertools import islice
 import json
 import random
 from models.schemas import WorldState, Agent, Item
@@ -37,6 +39,8 @@ class RuleEvent:
 class BaseRule(ABC):
     """基础规则类"""
     
+    trigger_hours: FrozenSet[int] = frozenset()  # 非时间规则没有固定触发小时
+    
     def __init__(self, rule_id: str, category: RuleCategory, priority: int = 1):
         self.rule_id = rule_id
         self.category = category
@@ -62,9 +66,9 @@ class BaseRule(ABC):
 class TemporalRule(BaseRule):
     """时间规则基类"""
     
-    def __init__(self, rule_id: str, trigger_hours: List[int], priority: int = 1):
+    def __init__(self, rule_id: str, trigger_hours: Iterable[int], priority: int = 1):
         super().__init__(rule_id, RuleCategory.TEMPORAL, priority)
-        self.trigger_hours = trigger_hours
+        self.trigger_hours = frozenset(trigger_hours)
     
     def check_trigger(self, world_state: WorldState) -> bool:
         return world_state.hour in self.trigger_hours
@@ -292,12 +296,22 @@ class FoodScarcityRule(ResourceRule):
         return "Monitors food scarcity and triggers competition behaviors when supplies are low"
 
 
+RULE_HISTORY_LIMIT = 10_000  # rule_history 保留的最大记录数
+
+
 class RuleEngine:
     """规则引擎 - 管理和执行所有规则"""
     
     def __init__(self):
         self.rules: Dict[str, BaseRule] = {}
-        self.rule_history: List[Dict[str, Any]] = []
+        self.rules_by_category: Dict[RuleCategory, List[str]] = {category: [] for category in RuleCategory}  # 按分类索引的规则ID
+        self.rules_by_trigger_hour: Dict[int, List[str]] = {hour: [] for hour in range(24)}  # 按触发小时索引的时间规则ID
+        self.rule_history: deque = deque(maxlen=RULE_HISTORY_LIMIT)  # 只保留最近的执行记录
+        self.execution_count = 0  # 累计执行次数（不受历史上限影响）
+        self.last_execution: Dict[str, str] = {}  # rule_id -> 最近执行时间
+        self._version = 0  # 规则注册、启停或执行时递增，用于失效下面的缓存
+        self._descriptions_cache: Optional[Dict[str, str]] = None
+        self._status_cache: Optional[tuple] = None  # (version, status)
         self.config = self._load_config()
         
         # 注册默认规则
@@ -335,24 +349,56 @@ class RuleEngine:
     
     def register_rule(self, rule: BaseRule):
         """注册规则"""
+        if rule.rule_id in self.rules:
+            self._unindex_rule(self.rules[rule.rule_id])
         self.rules[rule.rule_id] = rule
+        self.rules_by_category[rule.category].append(rule.rule_id)
+        for hour in rule.trigger_hours:
+            if hour in self.rules_by_trigger_hour:
+                self.rules_by_trigger_hour[hour].append(rule.rule_id)
+        self._rules_changed()
         print(f"Rule registered: {rule.rule_id} ({rule.category.value})")
     
     def unregister_rule(self, rule_id: str):
         """注销规则"""
         if rule_id in self.rules:
+            self._unindex_rule(self.rules[rule_id])
             del self.rules[rule_id]
+            self._rules_changed()
             print(f"Rule unregistered: {rule_id}")
     
-    def enable_rule(self, rule_id: str):
-        """启用规则"""
-        if rule_id in self.rules:
-            self.rules[rule_id].enabled = True
+    def _unindex_rule(self, rule: BaseRule):
+        """从分类和触发小时索引中移除规则"""
+        self.rules_by_category[rule.category].remove(rule.rule_id)
+        for rule_ids in self.rules_by_trigger_hour.values():
+            if rule.rule_id in rule_ids:
+                rule_ids.remove(rule.rule_id)
     
-    def disable_rule(self, rule_id: str):
-        """禁用规则"""
-        if rule_id in self.rules:
-            self.rules[rule_id].enabled = False
+    @property
+    def version(self) -> int:
+        """规则注册、启停或执行后都会变化，供外部缓存做失效判断"""
+        return self._version
+    
+    def _rules_changed(self):
+        """注册表变化时失效所有缓存"""
+        self._version += 1
+        self._descriptions_cache = None
+    
+    def enable_rule(self, rule_id: str) -> bool:
+        """启用规则，规则不存在时返回 False"""
+        return self._set_rule_enabled(rule_id, True)
+    
+    def disable_rule(self, rule_id: str) -> bool:
+        """禁用规则，规则不存在时返回 False"""
+        return self._set_rule_enabled(rule_id, False)
+    
+    def _set_rule_enabled(self, rule_id: str, enabled: bool) -> bool:
+        rule = self.rules.get(rule_id)
+        if rule is None:
+            return False
+        rule.enabled = enabled
+        self._version += 1
+        return True
     
     def execute_rules(self, world_state: WorldState) -> List[str]:
         """执行所有适用的规则"""
@@ -378,12 +424,16 @@ class RuleEngine:
                     executed_rules.append(rule_id)
                     
                     # 记录规则执行历史
+                    timestamp = f"Day {world_state.day} Hour {world_state.hour}"
                     self.rule_history.append({
                         "rule_id": rule_id,
-                        "timestamp": f"Day {world_state.day} Hour {world_state.hour}",
+                        "timestamp": timestamp,
                         "events_count": len(events),
                         "category": rule.category.value
                     })
+                    self.last_execution[rule_id] = timestamp
+                    self.execution_count += 1
+                    self._version += 1
             
             except Exception as e:
                 error_msg = f"⚠️ [RULE ERROR] {rule_id}: {str(e)}"
@@ -398,23 +448,34 @@ class RuleEngine:
         return all_events
     
     def get_rule_status(self) -> Dict[str, Any]:
-        """获取规则状态"""
-        return {
+        """获取规则状态（按版本缓存）"""
+        if self._status_cache is not None and self._status_cache[0] == self._version:
+            return self._status_cache[1]
+        
+        status = {
             "total_rules": len(self.rules),
             "enabled_rules": len([r for r in self.rules.values() if r.enabled]),
             "categories": {
-                category.value: len([r for r in self.rules.values() if r.category == category])
-                for category in RuleCategory
+                category.value: len(rule_ids)
+                for category, rule_ids in self.rules_by_category.items()
             },
-            "recent_executions": self.rule_history[-10:] if self.rule_history else []
+            "recent_executions": self.recent_executions(10)[::-1]
         }
+        self._status_cache = (self._version, status)
+        return status
+    
+    def recent_executions(self, limit: int) -> List[Dict[str, Any]]:
+        """最近的执行记录，最新的在前"""
+        return list(islice(reversed(self.rule_history), max(limit, 0)))
     
     def get_rule_descriptions(self) -> Dict[str, str]:
-        """获取所有规则的描述"""
-        return {
-            rule_id: rule.get_description()
-            for rule_id, rule in self.rules.items()
-        }
+        """获取所有规则的描述（描述是静态的，注册表变化前一直复用）"""
+        if self._descriptions_cache is None:
+            self._descriptions_cache = {
+                rule_id: rule.get_description()
+                for rule_id, rule in self.rules.items()
+            }
+        return self._descriptions_cache
 
 
 # 单例规则引擎
@@ -64,46 +64,20 @@ class SessionManager:
     def get_all_sessions(self) -> List[Dict[str, Any]]:
         """Get all available sessions from the database"""
         try:
-            # Get all events to find unique session IDs
-            events = event_logger.get_events(limit=10000)
-            session_data = {}
-            
-            for event in events:
-                session_id = event.session_id
-                if session_id not in session_data:
-                    session_data[session_id] = {
-                        "session_id": session_id,
-                        "start_time": event.timestamp,
-                        "end_time": event.timestamp,
-                        "event_count": 0,
-                        "agents": set(),
-                        "days": set()
-                    }
-                
-                # Update session data
-                session_data[session_id]["event_count"] += 1
-                session_data[session_id]["agents"].add(event.agent_name)
-                session_data[session_id]["days"].add(event.day)
-                
-                # Update time range
-                if event.timestamp > session_data[session_id]["end_time"]:
-                    session_data[session_id]["end_time"] = event.timestamp
-                if event.timestamp < session_data[session_id]["start_time"]:
-                    session_data[session_id]["start_time"] = event.timestamp
-            
-            # Convert to list and clean up
-            sessions = []
-            for session_id, data in session_data.items():
-                sessions.append({
-                    "session_id": session_id,
+            # Aggregated per session in SQL rather than over raw events
+            sessions = [
+                {
+                    "session_id": data["session_id"],
                     "start_time": data["start_time"],
                     "end_time": data["end_time"],
                     "event_count": data["event_count"],
                     "agent_count": len(data["agents"]),
                     "days_count": len(data["days"]),
-                    "agents": list(data["agents"]),
-                    "days": sorted(list(data["days"]))
-                })
+                    "agents": data["agents"],
+                    "days": data["days"]
+                }
+                for data in event_logger.get_session_overview()
+            ]
             
             # Sort by start time (most recent first)
             sessions.sort(key=lambda x: x["start_time"], reverse=True)
@@ -21,6 +21,7 @@ class World:
     def __init__(self):
         if not self._initialized:
             self.state = None
+            self.turn_order: List[str] = []
             self.rules = self._load_rules()
             self._initialized = True
     
@@ -54,6 +55,8 @@ class World:
         # Create agents
         self._create_initial_agents(guard_count, prisoner_count)
         
+        self._update_turn_order()
+        
         # Place initial items
         self._place_initial_items()
         
@@ -279,4 +282,10 @@ class World:
     
     def update_state(self, new_state: WorldState):
         """Update world state"""
-        self.state = new_state
\ No newline at end of file
+        self.state = new_state
+        self._update_turn_order()
+    
+    def _update_turn_order(self):
+        """Agents act in a fixed order each turn: guards first, then prisoners"""
+        agents = self.state.agents if self.state else {}
+        self.turn_order = sorted(agents, key=lambda x: (0 if x.startswith('guard') else 1, x))
\ No newline at end of file
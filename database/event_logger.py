@@ -4,12 +4,12 @@ Event logging system with SQLite database for complete event history
 
 import sqlite3
 import datetime
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Sequence
+from dataclasses import dataclass, fields
 import threading
 import os
 
-@dataclass
+@dataclass(slots=True)  # No per-row __dict__; exports build thousands of these
 class EventRecord:
     id: Optional[int]
     session_id: str
@@ -25,6 +25,35 @@ class EventRecord:
     ai_prompt_content: Optional[str] = None
     ai_thinking_process: Optional[str] = None
     ai_decision: Optional[str] = None
+    params: Optional[str] = None  # Serialized details["parameters"], only when requested
+
+EVENT_RECORD_FIELDS = tuple(field.name for field in fields(EventRecord))
+
+EVENT_COLUMNS = ("id, session_id, day, hour, minute, agent_id, agent_name, "
+                 "event_type, description, details, timestamp")
+AI_COLUMNS = "ai_prompt_content, ai_thinking_process, ai_decision"
+
+INSERT_EVENT_SQL = """
+    INSERT INTO events (session_id, day, hour, minute, agent_id, agent_name, 
+                      event_type, description, details, timestamp,
+                      ai_prompt_content, ai_thinking_process, ai_decision)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Same AI columns with NULL turned into '' for exporters that write plain text cells
+BLANK_AI_COLUMNS = ("COALESCE(ai_prompt_content, '') AS ai_prompt_content, "
+                    "COALESCE(ai_thinking_process, '') AS ai_thinking_process, "
+                    "COALESCE(ai_decision, '') AS ai_decision")
+
+# Pulls details["parameters"] out as compact JSON text in SQL ('{}' when details is
+# empty or has no parameters); NULL only when details is not a JSON object
+PARAMETERS_COLUMN = """
+    CASE
+        WHEN details IS NULL OR details = '' THEN '{}'
+        WHEN json_valid(details) AND json_type(details) = 'object' THEN
+            CASE WHEN json_type(details, '$.parameters') IS NULL THEN '{}'
+                 ELSE json_quote(json_extract(details, '$.parameters')) END
+    END AS params
+"""
 
 class EventLogger:
     """Thread-safe event logger with SQLite backend"""
@@ -86,6 +115,13 @@ class EventLogger:
             conn.execute("CREATE INDEX IF NOT EXISTS idx_day_hour ON events(day, hour)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type)")
             
+            # Composite indexes for the filtered, newest-first queries issued by get_events:
+            # equality on session (plus agent or event type) followed by the sort columns,
+            # so filtered pages are index range scans with no temp sort
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session_time ON events(session_id, day, hour, minute)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session_agent ON events(session_id, agent_id, day, hour, minute)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_session_type ON events(session_id, event_type, day, hour, minute)")
+            
             conn.commit()
             conn.close()
     
@@ -98,13 +134,9 @@ class EventLogger:
         
         with self.lock:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("""
-                INSERT INTO events (session_id, day, hour, minute, agent_id, agent_name, 
-                                  event_type, description, details, timestamp,
-                                  ai_prompt_content, ai_thinking_process, ai_decision)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (session_id, day, hour, minute, agent_id, agent_name, event_type, 
-                  description, details, timestamp, ai_prompt_content, ai_thinking_process, ai_decision))
+            cursor = conn.execute(INSERT_EVENT_SQL, (
+                session_id, day, hour, minute, agent_id, agent_name, event_type,
+                description, details, timestamp, ai_prompt_content, ai_thinking_process, ai_decision))
             
             event_id = cursor.lastrowid
             conn.commit()
@@ -112,14 +144,30 @@ class EventLogger:
             
             return event_id
     
-    def get_events(self, limit: int = 100, offset: int = 0, 
-                   agent_id: Optional[str] = None, 
-                   event_type: Optional[str] = None,
-                   day: Optional[int] = None,
-                   session_id: Optional[str] = None) -> List[EventRecord]:
-        """Get events with optional filtering"""
+    def log_events_bulk(self, events: Sequence[Dict[str, Any]]):
+        """Log several events in one transaction; each dict takes log_event's keyword arguments"""
+        if not events:
+            return
         
-        query = "SELECT * FROM events WHERE 1=1"
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (event["session_id"], event["day"], event["hour"], event["minute"],
+             event["agent_id"], event["agent_name"], event["event_type"], event["description"],
+             event.get("details", ""), timestamp, event.get("ai_prompt_content"),
+             event.get("ai_thinking_process"), event.get("ai_decision"))
+            for event in events
+        ]
+        
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            conn.executemany(INSERT_EVENT_SQL, rows)
+            conn.commit()
+            conn.close()
+    
+    def _filter_clause(self, agent_id: Optional[str], event_type: Optional[str],
+                       day: Optional[int], session_id: Optional[str]) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause and parameters shared by the event queries"""
+        query = "1=1"
         params = []
         
         if agent_id:
@@ -138,56 +186,108 @@ class EventLogger:
             query += " AND session_id = ?"
             params.append(session_id)
         
+        return query, params
+    
+    def count_events(self, agent_id: Optional[str] = None,
+                     event_type: Optional[str] = None,
+                     day: Optional[int] = None,
+                     session_id: Optional[str] = None) -> int:
+        """Count events matching the same filters as get_events"""
+        where, params = self._filter_clause(agent_id, event_type, day, session_id)
+        
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            total = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+            conn.close()
+            return total
+    
+    def get_events(self, limit: int = 100, offset: int = 0, 
+                   agent_id: Optional[str] = None, 
+                   event_type: Optional[str] = None,
+                   day: Optional[int] = None,
+                   session_id: Optional[str] = None,
+                   before: Optional[Tuple[int, int, int, int]] = None,
+                   include_parameters: bool = False,
+                   blank_ai_fields: bool = False,
+                   columns: Optional[Sequence[str]] = None) -> List[EventRecord]:
+        """Get events with optional filtering, newest first (day, hour, minute, id descending)
+        
+        `before` is a keyset cursor (day, hour, minute, id) taken from the last
+        event of the previous page; it replaces `offset` for deep pagination.
+        `include_parameters` fills `EventRecord.params` from the details JSON;
+        `blank_ai_fields` returns '' instead of None for the AI text columns.
+        `columns` projects onto a subset of EventRecord fields (the rest are None)
+        so callers that only need a few fields skip the large AI text blobs.
+        """
+        
+        if columns is not None:
+            unknown = set(columns) - set(EVENT_RECORD_FIELDS) - {"params"}
+            if unknown:
+                raise ValueError(f"Unknown event columns: {sorted(unknown)}")
+            selected = ", ".join(column for column in columns if column != "params")
+        else:
+            selected = f"{EVENT_COLUMNS}, {BLANK_AI_COLUMNS if blank_ai_fields else AI_COLUMNS}"
+        if include_parameters:
+            selected += f", {PARAMETERS_COLUMN}"
+        where, params = self._filter_clause(agent_id, event_type, day, session_id)
+        query = f"SELECT {selected} FROM events WHERE {where}"
+        
+        if before is not None:
+            query += " AND (day, hour, minute, id) < (?, ?, ?, ?)"
+            params.extend(before)
+        
         query += " ORDER BY day DESC, hour DESC, minute DESC, id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
         with self.lock:
             conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
             cursor = conn.execute(query, params)
-            
-            events = []
-            for row in cursor.fetchall():
-                # Handle potential missing columns for backward compatibility
-                ai_prompt_content = None
-                ai_thinking_process = None
-                ai_decision = None
-                
-                try:
-                    ai_prompt_content = row["ai_prompt_content"]
-                except (KeyError, IndexError):
-                    pass
-                    
-                try:
-                    ai_thinking_process = row["ai_thinking_process"]
-                except (KeyError, IndexError):
-                    pass
-                    
-                try:
-                    ai_decision = row["ai_decision"]
-                except (KeyError, IndexError):
-                    pass
-                
-                events.append(EventRecord(
-                    id=row["id"],
-                    session_id=row["session_id"],
-                    day=row["day"],
-                    hour=row["hour"], 
-                    minute=row["minute"],
-                    agent_id=row["agent_id"],
-                    agent_name=row["agent_name"],
-                    event_type=row["event_type"],
-                    description=row["description"],
-                    details=row["details"],
-                    timestamp=row["timestamp"],
-                    ai_prompt_content=ai_prompt_content,
-                    ai_thinking_process=ai_thinking_process,
-                    ai_decision=ai_decision
-                ))
+            names = tuple(description[0] for description in cursor.description)
+            if names in (EVENT_RECORD_FIELDS, EVENT_RECORD_FIELDS[:-1]):
+                # Unprojected rows (with or without params) line up with the dataclass fields, so build them positionally
+                events = [EventRecord(*row) for row in cursor.fetchall()]
+            else:
+                empty_record = dict.fromkeys(EVENT_RECORD_FIELDS)
+                events = [EventRecord(**{**empty_record, **dict(zip(names, row))})
+                          for row in cursor.fetchall()]
             
             conn.close()
             return events
     
+    def iter_event_batches(self, batch_size: int = 500, limit: Optional[int] = None,
+                           agent_id: Optional[str] = None,
+                           event_type: Optional[str] = None,
+                           day: Optional[int] = None,
+                           session_id: Optional[str] = None,
+                           include_parameters: bool = False,
+                           blank_ai_fields: bool = False) -> Iterator[List[EventRecord]]:
+        """Yield filtered events in keyset-paginated batches so exports never hold every row at once"""
+        cursor = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+            batch = self.get_events(
+                limit=page_size,
+                agent_id=agent_id,
+                event_type=event_type,
+                day=day,
+                session_id=session_id,
+                before=cursor,
+                include_parameters=include_parameters,
+                blank_ai_fields=blank_ai_fields
+            )
+            if not batch:
+                break
+            
+            yield batch
+            
+            if len(batch) < page_size:
+                break
+            last = batch[-1]
+            cursor = (last.day, last.hour, last.minute, last.id)
+            if remaining is not None:
+                remaining -= len(batch)
+    
     def get_recent_events_for_agent(self, agent_id: str, session_id: str, limit: int = 10) -> List[str]:
         """Get recent event descriptions for an agent (for memory system)"""
         events = self.get_events(limit=limit, agent_id=agent_id, session_id=session_id)
@@ -234,5 +334,73 @@ class EventLogger:
                 "events_by_agent": agent_stats
             }
 
+    def get_session_aggregates(self, session_id: str) -> Dict[str, Any]:
+        """Get per-session event counts, computed with GROUP BY queries"""
+        where = "FROM events WHERE session_id = ?"
+        params = (session_id,)
+        
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            
+            total, unique_agents, max_day, start_time, end_time = conn.execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT agent_name), MAX(day), MIN(timestamp), MAX(timestamp) {where}",
+                params
+            ).fetchone()
+            
+            event_types = dict(conn.execute(
+                f"SELECT event_type, COUNT(*) {where} GROUP BY event_type", params
+            ).fetchall())
+            daily_activity = dict(conn.execute(
+                f"SELECT day, COUNT(*) {where} GROUP BY day ORDER BY day", params
+            ).fetchall())
+            agent_counts = dict(conn.execute(
+                f"SELECT agent_name, COUNT(*) {where} GROUP BY agent_name", params
+            ).fetchall())
+            
+            conn.close()
+        
+        return {
+            "total_events": total,
+            "unique_agents": unique_agents,
+            "max_day": max_day or 0,
+            "start_time": start_time,
+            "end_time": end_time,
+            "event_types": event_types,
+            "daily_activity": daily_activity,
+            "agent_counts": agent_counts
+        }
+
+    def get_session_overview(self) -> List[Dict[str, Any]]:
+        """Get per-session counts, time range, agents and days for every logged session"""
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            
+            sessions = {}
+            for session_id, start_time, end_time, event_count in conn.execute(
+                "SELECT session_id, MIN(timestamp), MAX(timestamp), COUNT(*) FROM events GROUP BY session_id"
+            ):
+                sessions[session_id] = {
+                    "session_id": session_id,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "event_count": event_count,
+                    "agents": [],
+                    "days": []
+                }
+            
+            for session_id, agent_name in conn.execute(
+                "SELECT DISTINCT session_id, agent_name FROM events"
+            ):
+                sessions[session_id]["agents"].append(agent_name)
+            
+            for session_id, day in conn.execute(
+                "SELECT DISTINCT session_id, day FROM events ORDER BY session_id, day"
+            ):
+                sessions[session_id]["days"].append(day)
+            
+            conn.close()
+        
+        return list(sessions.values())
+
 # Global event logger instance
 event_logger = EventLogger()
\ No newline at end of file
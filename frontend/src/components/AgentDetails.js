@@ -281,7 +281,7 @@ function AgentDetails() {
                       marginBottom: '4px',
                       fontWeight: 'bold'
                     }}>
-                      🕒 {entry.timestamp}
+                      🕒 Day {entry.day} Hour {entry.hour}
                     </div>
                     <div style={{ color: '#ddd', lineHeight: '1.4' }}>
                       {entry.content}
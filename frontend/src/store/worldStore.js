@@ -3,6 +3,25 @@
  */
 import { create } from 'zustand';
 
+// Return a copy of state with each dotted path (e.g. "agents.guard_001.memory") replaced
+const applyPatch = (state, values, appends = {}) => {
+  const next = { ...state };
+  const update = (path, change) => {
+    const keys = path.split('.');
+    let target = next;
+    keys.slice(0, -1).forEach((key) => {
+      target[key] = { ...(target[key] || {}) };
+      target = target[key];
+    });
+    const last = keys[keys.length - 1];
+    target[last] = change(target[last]);
+  };
+  Object.entries(values).forEach(([path, value]) => update(path, () => value));
+  // Append-only lists such as event_log arrive as just their new items
+  Object.entries(appends).forEach(([path, items]) => update(path, (current) => (current || []).concat(items)));
+  return next;
+};
+
 const useWorldStore = create((set, get) => ({
   // World state
   worldState: null,
@@ -15,7 +34,17 @@ const useWorldStore = create((set, get) => ({
   // Actions
   setWorldState: (worldState) => set({ worldState }),
   setConnected: (isConnected) => set({ isConnected }),
-  setSelectedAgent: (agent) => set({ selectedAgent: agent }),
+  setSelectedAgent: (agent) => {
+    // Follow the selected agent's room so its goal/memory patches reach us
+    const { selectedAgent, sendMessage } = get();
+    if (selectedAgent && selectedAgent !== agent) {
+      sendMessage('unsubscribe', { room: `agent:${selectedAgent}` });
+    }
+    if (agent) {
+      sendMessage('subscribe', { room: `agent:${agent}` });
+    }
+    set({ selectedAgent: agent });
+  },
   clearWorldState: () => set({ worldState: null, selectedAgent: null }),
   
   // Connect to WebSocket
@@ -31,6 +60,15 @@ const useWorldStore = create((set, get) => ({
         type: 'get_world_state',
         payload: {}
       }));
+      
+      // Re-join the selected agent's room after a reconnect
+      const { selectedAgent } = get();
+      if (selectedAgent) {
+        socket.send(JSON.stringify({
+          type: 'subscribe',
+          payload: { room: `agent:${selectedAgent}` }
+        }));
+      }
     };
     
     socket.onmessage = (event) => {
@@ -54,6 +92,12 @@ const useWorldStore = create((set, get) => ({
               // Don't crash, just log the error
             }
             break;
+          case 'patch':
+            // Partial update carrying only the fields that changed
+            set(state => ({
+              worldState: state.worldState ? applyPatch(state.worldState, message.values, message.appends) : null
+            }));
+            break;
           case 'experiment_started':
             console.log('Experiment started');
             set(state => ({ 
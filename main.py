@@ -3,16 +3,59 @@ Project Prometheus - AI Social Behavior Simulation Platform
 FastAPI Application Entry Point
 """
 
-import uvicorn
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from api.rest import router as rest_router
 from api.websockets import router as ws_router
 
+def configure_logging():
+    """Queue log records and write them from a listener thread, off the event loop
+    
+    Returns a function that stops the listener and removes the queue handler,
+    or None if logging was already configured this way.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return None
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    previous_level = root.level
+    
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+    listener.start()
+    
+    def shutdown():
+        root.removeHandler(queue_handler)
+        root.setLevel(previous_level)
+        listener.stop()
+    
+    return shutdown
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Set up logging while the server runs, and flush it on shutdown"""
+    shutdown_logging = configure_logging()
+    try:
+        yield
+    finally:
+        if shutdown_logging:
+            shutdown_logging()
+
 app = FastAPI(
     title="Project Prometheus",
     description="AI Social Behavior Simulation Platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend
@@ -24,6 +67,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON/CSV responses (world state, rule status, exports)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(rest_router, prefix="/api/v1")
 app.include_router(ws_router)
@@ -34,6 +80,7 @@ async def root():
 
 if __name__ == "__main__":
     import os
+    import uvicorn
     from dotenv import load_dotenv
     load_dotenv()
     
@@ -41,4 +88,11 @@ if __name__ == "__main__":
     port = int(os.getenv('PORT', 24861))
     debug = os.getenv('DEBUG', 'false').lower() == 'true'
     
-    uvicorn.run("main:app", host=host, port=port, reload=debug)
\ No newline at end of file
+    # The simulation loop runs on the server's event loop; prefer libuv when available
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    
+    uvicorn.run("main:app", host=host, port=port, reload=debug, loop=loop)
\ No newline at end of file
@@ -8,8 +8,15 @@ from models.schemas import WorldState, Agent, ActionResult
 from models.enums import ActionEnum, ItemEnum
 import random
 import json
+from functools import lru_cache
 from database.event_logger import event_logger
 
+@lru_cache(maxsize=1)
+def _load_game_rules():
+    """Parse configs/game_rules.json once instead of on every attack (read-only)"""
+    with open('configs/game_rules.json', 'r') as f:
+        return json.load(f)
+
 class BaseAction(ABC):
     """Base class for all actions"""
     
@@ -246,8 +253,7 @@ class AttackAction(BaseAction):
             return ActionResult(success=False, message="Target too far away")
         
         # Load game rules
-        with open('configs/game_rules.json', 'r') as f:
-            rules = json.load(f)
+        rules = _load_game_rules()
         
         # Calculate damage
         base_damage = rules["combat_rules"]["base_damage"]
@@ -1130,4 +1136,7 @@ ACTION_REGISTRY = {
     ActionEnum.CRAFT_WEAPON: CraftWeaponAction,
     ActionEnum.SPREAD_RUMOR: SpreadRumorAction,
     ActionEnum.DIG_TUNNEL: DigTunnelAction,
-}
\ No newline at end of file
+}
+
+# Actions carry no per-call state, so one shared instance per type is enough
+ACTION_INSTANCES = {action_type: action_class() for action_type, action_class in ACTION_REGISTRY.items()}
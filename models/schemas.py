@@ -44,6 +44,7 @@ class DynamicGoals(BaseModel):
     life_goals: List[str] = []  # Long-term aspirations
     current_goal: str = ""  # AI-generated current focus
     manual_intervention_goals: List[Objective] = []  # User-injected goals
+    _manual_goal_seq: int = 0  # Private counter for ids of injected goals
 
 class Agent(BaseModel):
     agent_id: str
@@ -104,6 +105,7 @@ class WorldState(BaseModel):
     event_log: List[str] = []
     agent_prompts: Dict[str, PromptData] = {}  # key: agent_id -> prompt data
     environmental_injection: str = ""  # Admin injected environmental context
+    _next_item_seq: int = 0  # Private counter for ids of items placed during this session
     
     class Config:
         arbitrary_types_allowed = True
@@ -834,25 +834,22 @@ Time: Day {world_state.day}, Hour {world_state.hour}
         
         for agent_id, agent in world_state.agents.items():
             if agent.role.value == "Prisoner":
-                x, y = agent.position
-                pos_key = f"{x},{y}"
-                if pos_key not in prisoner_positions:
-                    prisoner_positions[pos_key] = []
-                prisoner_positions[pos_key].append(agent.name)
+                # Keyed by the (x, y) tuple so the cluster check below needs no parsing
+                prisoner_positions.setdefault(tuple(agent.position), []).append(agent.name)
         
         # Check for gatherings (3+ prisoners in same location)
-        for pos, prisoners in prisoner_positions.items():
+        for (x, y), prisoners in prisoner_positions.items():
             if len(prisoners) >= 3:
-                return True, f"Prisoners {', '.join(prisoners)} are gathering at position {pos}"
+                return True, f"Prisoners {', '.join(prisoners)} are gathering at position {x},{y}"
         
         # Check for suspicious clustering (2+ prisoners in adjacent cells)
         clusters = []
         for pos1, prisoners1 in prisoner_positions.items():
             if len(prisoners1) >= 2:
-                x1, y1 = map(int, pos1.split(','))
+                x1, y1 = pos1
                 for pos2, prisoners2 in prisoner_positions.items():
                     if pos1 != pos2 and len(prisoners2) >= 1:
-                        x2, y2 = map(int, pos2.split(','))
+                        x2, y2 = pos2
                         # Check if adjacent (within 1 cell)
                         if max(abs(x1-x2), abs(y1-y2)) <= 1:
                             cluster_desc = f"{', '.join(prisoners1)} and {', '.join(prisoners2)} are clustering"
@@ -0,0 +1,52 @@
+"""
+Tests for the SQLite event logger
+测试事件日志查询
+"""
+
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append('.')
+
+from database.event_logger import EventLogger, EVENT_RECORD_FIELDS
+
+
+def _logger_with_event():
+    db_dir = tempfile.mkdtemp()
+    logger = EventLogger(os.path.join(db_dir, "events.db"))
+    logger.log_event(
+        session_id="session_test", day=1, hour=8, minute=0,
+        agent_id="guard_001", agent_name="Guard 1", event_type="action",
+        description="Guard 1 moved", details='{"parameters": {"x": 1}}'
+    )
+    return logger
+
+
+def test_get_events_unprojected():
+    """不指定列时返回完整记录"""
+    events = _logger_with_event().get_events(include_parameters=True)
+    assert len(events) == 1
+    assert events[0].agent_id == "guard_001"
+    assert events[0].params == '{"x":1}'
+
+
+def test_get_events_prefix_projection():
+    """只选前几列时其余字段为 None，而不是按位置构造失败"""
+    logger = _logger_with_event()
+    for columns in (("id",), ("id", "session_id")):
+        events = logger.get_events(columns=columns)
+        assert len(events) == 1
+        record = events[0]
+        assert record.id is not None
+        for field in EVENT_RECORD_FIELDS:
+            if field not in columns:
+                assert getattr(record, field) is None
+    assert logger.get_events(columns=("id", "session_id"))[0].session_id == "session_test"
+
+
+if __name__ == "__main__":
+    test_get_events_unprojected()
+    test_get_events_prefix_projection()
+    print("✅ Event logger tests passed")
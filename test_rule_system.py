@@ -222,21 +222,22 @@ def test_rule_api_integration():
     try:
         from api.rule_management import get_rule_engine_status, list_all_rules
         import asyncio
+        import json
         
-        # Test status endpoint
+        # Test status endpoint (handlers return pre-rendered JSON responses)
         print("📊 Testing rule engine status API...")
-        status = asyncio.run(get_rule_engine_status())
+        status = json.loads(asyncio.run(get_rule_engine_status()).body)
         print(f"  ✅ Status API response: {status['success']}")
         print(f"  📈 Total rules: {status['data']['total_rules']}")
         print(f"  🟢 Enabled rules: {status['data']['enabled_rules']}")
         
         # Test rule list endpoint
         print("\n📋 Testing rule list API...")
-        rules_list = asyncio.run(list_all_rules())
+        rules_list = json.loads(asyncio.run(list_all_rules()).body)
         print(f"  ✅ Retrieved {len(rules_list)} rules")
         
         for rule in rules_list[:3]:  # Show first 3 rules
-            print(f"    • {rule.rule_id} ({rule.category}) - Enabled: {rule.enabled}")
+            print(f"    • {rule['rule_id']} ({rule['category']}) - Enabled: {rule['enabled']}")
         
         return True
         
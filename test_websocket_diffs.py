@@ -0,0 +1,124 @@
+"""
+Tests for WebSocket diff frames
+测试 WebSocket 增量广播
+"""
+
+import asyncio
+import sys
+
+import orjson
+
+# Add project root to path
+sys.path.append('.')
+
+from api.websockets import ConnectionManager, appended_items
+from core.world import World
+
+
+def test_appended_items():
+    """只在列表单纯增长时返回新增项"""
+    # Empty previous list: everything is new
+    assert appended_items(b'[]', b'["a","b"]') == b'["a","b"]'
+    # Pure append
+    assert appended_items(b'["a"]', b'["a","b","c"]') == b'["b","c"]'
+    # Item extended in place is not an append
+    assert appended_items(b'["a"]', b'["ab"]') is None
+    # Shrunk after a trim
+    assert appended_items(b'["a","b","c"]', b'["c","d"]') is None
+
+
+def _manager_with_snapshot():
+    world_state = World().initialize_world(guard_count=1, prisoner_count=1)
+    manager = ConnectionManager()
+    first = orjson.loads(manager._diff_frame(world_state))
+    assert first["type"] == "world_update"
+    return manager, world_state
+
+
+def test_diff_frame_no_change():
+    """状态未变时不发送帧"""
+    manager, world_state = _manager_with_snapshot()
+    assert manager._diff_frame(world_state) is None
+
+
+def test_diff_frame_appends_event_log():
+    """事件日志增长时只发送新增条目"""
+    manager, world_state = _manager_with_snapshot()
+    world_state.event_log.append("💀 Prisoner 1 has died")
+    frame = orjson.loads(manager._diff_frame(world_state))
+    assert frame["type"] == "patch"
+    assert frame["paths"] == ["event_log"]
+    assert frame["values"] == {}
+    assert frame["appends"] == {"event_log": ["💀 Prisoner 1 has died"]}
+
+
+def test_diff_frame_replaces_trimmed_event_log():
+    """事件日志被裁剪后发送完整列表"""
+    manager, world_state = _manager_with_snapshot()
+    world_state.event_log.append("new entry")
+    del world_state.event_log[:-1]
+    frame = orjson.loads(manager._diff_frame(world_state))
+    assert "appends" not in frame
+    assert frame["values"] == {"event_log": ["new entry"]}
+
+
+class _RecordingSocket:
+    def __init__(self):
+        self.sent = []
+    
+    async def send_text(self, text):
+        self.sent.append(orjson.loads(text))
+
+
+def test_subscribe_sends_agent_state():
+    """订阅代理房间时先收到该代理的当前状态"""
+    manager = ConnectionManager()
+    world_state = manager.game_engine.world.initialize_world(guard_count=1, prisoner_count=1)
+    agent = world_state.agents["guard_001"]
+    agent.dynamic_goals.current_goal = "Edited while paused"
+    
+    websocket = _RecordingSocket()
+    asyncio.run(manager.handle_client_message(
+        websocket, {"type": "subscribe", "payload": {"room": "agent:guard_001"}}
+    ))
+    assert manager.rooms["agent:guard_001"] == {websocket}
+    assert len(websocket.sent) == 1
+    frame = websocket.sent[0]
+    assert frame["type"] == "patch"
+    assert frame["paths"] == ["agents.guard_001"]
+    assert frame["values"]["agents.guard_001"]["dynamic_goals"]["current_goal"] == "Edited while paused"
+    assert "thinking_history" not in frame["values"]["agents.guard_001"]["enhanced_memory"]
+    
+    # Other rooms have nothing to catch up on
+    other = _RecordingSocket()
+    asyncio.run(manager.handle_client_message(
+        other, {"type": "subscribe", "payload": {"room": "agent:nobody"}}
+    ))
+    assert other.sent == []
+
+
+def test_global_update_supersedes_room_patches():
+    """全局更新会覆盖已排队的房间补丁"""
+    manager = ConnectionManager()
+    world_state = World().initialize_world(guard_count=1, prisoner_count=1)
+    websocket = _RecordingSocket()
+    manager.active_connections.add(websocket)
+    manager.subscribe(websocket, "agent:guard_001")
+    
+    async def flush_both():
+        manager.schedule_broadcast(world_state, ["agents.guard_001.memory"], room="agent:guard_001")
+        manager.schedule_broadcast(world_state)
+        await manager.flush_broadcasts()
+    
+    asyncio.run(flush_both())
+    assert [frame["type"] for frame in websocket.sent] == ["world_update"]
+
+
+if __name__ == "__main__":
+    test_appended_items()
+    test_diff_frame_no_change()
+    test_diff_frame_appends_event_log()
+    test_diff_frame_replaces_trimmed_event_log()
+    test_subscribe_sends_agent_state()
+    test_global_update_supersedes_room_patches()
+    print("✅ WebSocket diff tests passed")